@@ -1,8 +1,29 @@
-from fastapi import FastAPI, APIRouter
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, APIRouter, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from api.config.redis_config import open_redis_connection, close_redis_connection, l1_cache
 from api.routes.timetable import router as timetable_router
+from api.routes.classes import router as classes_router
+from api.routes.calendar import router as calendar_router
+from api.services.extraction import start_extraction_pool, shutdown_extraction_pool, get_pending_count
+from api.services.metrics import observe, registry
+from api.services.warmup import start_draft_watcher, stop_draft_watcher, get_warmup_status
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await open_redis_connection()
+    start_extraction_pool()
+    start_draft_watcher()
+    yield
+    await stop_draft_watcher()
+    shutdown_extraction_pool()
+    await close_redis_connection()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app_router = APIRouter(prefix="/api/v1")
 
@@ -12,8 +33,23 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+    """Record how long each route takes to answer, up to sending the response headers."""
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    observe(
+        "easechaos_request_duration_seconds",
+        time.perf_counter() - start,
+        route=getattr(route, "path", "unmatched"),
+        method=request.method,
+    )
+    return response
+
 @app.get("/")
 def root():
     return {"Hello": "World"}
@@ -23,5 +59,23 @@ def health_check():
     """A function to check the health of the server."""
     return {"status": "healthy"}
 
+@app.get("/api/v1/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Stage timings, cache hit counts, parse counts and queue depth of this worker, in Prometheus text format."""
+    l1_stats = l1_cache.stats()
+    gauges = {
+        ("easechaos_extraction_queue_depth", ()): get_pending_count(),
+        ("easechaos_l1_cache_entries", ()): l1_stats["entries"],
+        ("easechaos_l1_cache_bytes", ()): l1_stats["bytes"],
+    }
+    return PlainTextResponse(registry.render(gauges), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/v1/warmup")
+def warmup_status():
+    """Progress of pre-extracting and caching the timetables of every draft."""
+    return get_warmup_status()
+
 app.include_router(router=app_router)
-app.include_router(timetable_router, prefix="/api/v1")
\ No newline at end of file
+app.include_router(timetable_router, prefix="/api/v1")
+app.include_router(classes_router, prefix="/api/v1")
+app.include_router(calendar_router, prefix="/api/v1")
\ No newline at end of file
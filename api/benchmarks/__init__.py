@@ -0,0 +1,5 @@
+import os
+
+# Benchmarks run against an in-memory fake of Redis, so its settings only need to exist
+for _name, _value in (("REDIS_HOST", "localhost"), ("REDIS_PORT", "6379"), ("REDIS_PASSWORD", "")):
+    os.environ.setdefault(_name, _value)
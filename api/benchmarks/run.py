@@ -0,0 +1,345 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+
+from api.benchmarks.synthetic import generate_synthetic_drafts
+from api.config.redis_config import DRAFTS_FOLDER, SNAPSHOTS_FOLDER, settings
+from api.extract import extract_exam_table, extract_lectures_table
+from api.services import fingerprint
+
+logger = logging.getLogger(__name__)
+
+TARGETS = ("extract", "endpoint")
+
+# Smaller slowdowns are noise, whatever their percentage
+_MIN_REGRESSION_MS = 2.0
+
+
+def peak_rss_bytes() -> int:
+    """Peak resident set size of this process so far."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # kilobytes on Linux
+
+
+def _megabytes(size: int) -> float:
+    return round(size / 2**20, 1)
+
+
+def summarize(latencies: list[float]) -> dict:
+    """
+    Latency percentiles and throughput of sequential calls.
+
+    Throughput only counts the time spent in the calls, not resetting caches between them.
+    """
+    milliseconds = np.array(latencies) * 1000
+    p50, p90, p99 = np.percentile(milliseconds, [50, 90, 99])
+    return {
+        "iterations": len(latencies),
+        "throughput_per_s": round(len(latencies) / sum(latencies), 1),
+        "mean_ms": round(float(milliseconds.mean()), 3),
+        "p50_ms": round(float(p50), 3),
+        "p90_ms": round(float(p90), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(float(milliseconds.max()), 3),
+    }
+
+
+def measure(call: Callable[[int], object], iterations: int, reset: Callable[[], None] | None = None) -> dict:
+    """Time iterations of a call, given the iteration number, optionally resetting caches before each."""
+    latencies = []
+    for iteration in range(iterations):
+        if reset is not None:
+            reset()
+        start = time.perf_counter()
+        call(iteration)
+        latencies.append(time.perf_counter() - start)
+    return summarize(latencies)
+
+
+def import_extraction_jobs():
+    """Import the module the endpoint's extraction jobs are defined in, as a worker does for its first job."""
+    import api.routes.timetable  # noqa: F401
+
+
+def pick_class_patterns(path: Path, count: int) -> list[str]:
+    """Up to count class patterns spread over the draft, so no single class is measured."""
+    if extract_lectures_table.is_lecture_workbook(str(path)):
+        patterns = extract_lectures_table.get_class_patterns(str(path))
+    else:
+        patterns = extract_exam_table.get_exam_class_patterns(str(path))
+    return patterns[:: max(1, len(patterns) // count)][:count]
+
+
+def delete_snapshots(path: Path):
+    """Delete the on-disk snapshots of a draft, so it is parsed from Excel again."""
+    for snapshot in (SNAPSHOTS_FOLDER / path.stem).glob("*.arrow"):
+        snapshot.unlink()
+
+
+def forget_parsed_drafts():
+    """Drop every fingerprint and parsed draft kept in memory, as in a fresh process."""
+    fingerprint._fingerprints.clear()
+    extract_lectures_table._workbook_indexes.clear()
+    extract_lectures_table._sheet_indexes.clear()
+    extract_exam_table._exam_timetables.clear()
+    extract_exam_table._exam_date_indexes.clear()
+
+
+def bench_extraction(path: Path, iterations: int, cold_iterations: int, pattern_count: int) -> dict:
+    """
+    Time get_time_table (lecture drafts) or get_exam_timetable (exam drafts) in this process.
+
+    States:
+        cold: nothing in memory and no snapshot, the draft is parsed from Excel
+        snapshot: nothing in memory, the draft is loaded from its on-disk snapshot
+        warm: the parsed draft is in memory
+    """
+    rss_after_import = peak_rss_bytes()
+    if extract_lectures_table.is_lecture_workbook(str(path)):
+        extract = extract_lectures_table.get_time_table
+    else:
+        extract = extract_exam_table.get_exam_timetable
+
+    patterns = pick_class_patterns(path, pattern_count)
+
+    def call(iteration: int):
+        extract(str(path), patterns[iteration % len(patterns)])
+
+    def forget_draft():
+        forget_parsed_drafts()
+        delete_snapshots(path)
+
+    states = {
+        "cold": measure(call, cold_iterations, reset=forget_draft),
+        "snapshot": measure(call, cold_iterations, reset=forget_parsed_drafts),
+    }
+    # The last snapshot load left the draft in memory
+    states["warm"] = measure(call, iterations)
+
+    return {
+        "target": extract.__name__,
+        "class_patterns": patterns,
+        "states": states,
+        "rss_after_import_mb": _megabytes(rss_after_import),
+        "peak_rss_mb": _megabytes(peak_rss_bytes()),
+    }
+
+
+def bench_endpoint(path: Path, iterations: int, pattern_count: int) -> dict:
+    """
+    Time POST /api/v1/get_time_table through the whole app, with one extraction worker and a fake Redis.
+
+    States:
+        first_request: a worker that never saw the draft and no snapshot, as for a draft's first student
+        cold: no response cached, the timetable is extracted from the worker's parsed draft
+        warm_l1: responses cached in this process
+        warm_redis: responses cached in Redis only
+    """
+    import fakeredis
+    from fastapi.testclient import TestClient
+
+    from api.config import redis_config
+    from api.routes import timetable
+    from api.services.extraction import run_extraction
+
+    settings.WARMUP_ENABLED = False
+    # A single worker, whose peak RSS is that of the extractions
+    settings.EXTRACTION_WORKERS = 1
+    redis_config.get_redis_connection = fakeredis.aioredis.FakeRedis
+    # Drafts are served, and their cached versions checked, from one folder: the benchmarked draft's
+    timetable.DRAFTS_FOLDER = redis_config.DRAFTS_FOLDER = path.parent
+
+    from api.api import app
+
+    rss_after_import = peak_rss_bytes()
+    is_exam = not extract_lectures_table.is_lecture_workbook(str(path))
+    patterns = pick_class_patterns(path, pattern_count)
+    delete_snapshots(path)
+    response_sizes = []
+
+    with TestClient(app) as client:
+
+        def call(iteration: int):
+            response = client.post(
+                "/api/v1/get_time_table",
+                json={"filename": path.stem, "class_pattern": patterns[iteration % len(patterns)], "is_exam": is_exam},
+            )
+            response.raise_for_status()
+            response_sizes.append(len(response.content))
+
+        def forget_responses():
+            redis_config.l1_cache.clear()
+            client.portal.call(redis_config.r.flushall)
+
+        # Start the worker, its startup and imports are not part of any request
+        client.portal.call(run_extraction, import_extraction_jobs)
+        states = {
+            "first_request": measure(call, 1),
+            "cold": measure(call, iterations, reset=forget_responses),
+        }
+        for iteration in range(len(patterns)):
+            call(iteration)
+        states["warm_l1"] = measure(call, iterations)
+        states["warm_redis"] = measure(call, iterations, reset=redis_config.l1_cache.clear)
+
+        worker_peak_rss = client.portal.call(run_extraction, peak_rss_bytes)
+
+    return {
+        "target": "endpoint",
+        "class_patterns": patterns,
+        "states": states,
+        "mean_response_bytes": round(sum(response_sizes) / len(response_sizes)),
+        "rss_after_import_mb": _megabytes(rss_after_import),
+        "peak_rss_mb": _megabytes(peak_rss_bytes()),
+        "worker_peak_rss_mb": _megabytes(worker_peak_rss),
+    }
+
+
+def run_case(target: str, draft: Path, args: argparse.Namespace, snapshots_folder: str) -> dict:
+    """
+    Benchmark one target on one draft in a fresh interpreter.
+
+    Every case gets its own process, so caches start empty and peak RSS is the case's own.
+    It and its extraction workers write snapshots to snapshots_folder rather than api/snapshots.
+    """
+    command = [sys.executable, "-m", "api.benchmarks.run", "--case", target, str(draft.resolve())]
+    command += ["--iterations", str(args.iterations), "--cold-iterations", str(args.cold_iterations)]
+    command += ["--patterns", str(args.patterns)]
+    env = {**os.environ, "SNAPSHOTS_FOLDER": snapshots_folder}
+    completed = subprocess.run(command, capture_output=True, text=True, cwd=Path(__file__).parents[2], env=env)
+    if completed.returncode != 0:
+        error = (completed.stderr.strip().splitlines() or [f"exit status {completed.returncode}"])[-1]
+        logger.error(f"Benchmarking {target} on {draft.name} failed: {error}")
+        return {"target": target, "error": error}
+    return json.loads(completed.stdout.splitlines()[-1])
+
+
+def find_regressions(results: list[dict], baseline: dict, tolerance: float) -> list[str]:
+    """
+    Compare median latencies and peak RSS with an earlier run of the same cases.
+
+    Returns:
+        One line per state or case that got more than tolerance slower or bigger
+    """
+    previous = {(result["draft"], result["target"]): result for result in baseline["results"] if "states" in result}
+
+    regressions = []
+    for result in results:
+        before = previous.get((result["draft"], result["target"]))
+        if before is None or "states" not in result:
+            continue
+
+        name = f"{result['draft']} {result['target']}"
+        for state, summary in result["states"].items():
+            if state not in before["states"]:
+                continue
+            old, new = before["states"][state]["p50_ms"], summary["p50_ms"]
+            if new > old * (1 + tolerance) and new - old >= _MIN_REGRESSION_MS:
+                regressions.append(f"{name} {state}: p50 {old} ms -> {new} ms")
+
+        if result["peak_rss_mb"] > before["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(f"{name}: peak RSS {before['peak_rss_mb']} MB -> {result['peak_rss_mb']} MB")
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark timetable extraction and the timetable endpoint.")
+    parser.add_argument("drafts", nargs="*", type=Path, help="Drafts to benchmark (default: every draft in api/drafts)")
+    parser.add_argument(
+        "--scale",
+        type=int,
+        action="append",
+        default=[],
+        help="Also benchmark synthetic drafts this many times larger, repeatable (e.g. --scale 10 --scale 100)",
+    )
+    parser.add_argument(
+        "--synthetic-folder",
+        type=Path,
+        default=Path(tempfile.gettempdir()) / "easechaos-synthetic-drafts",
+        help="Where synthetic drafts are generated, and reused from",
+    )
+    parser.add_argument("--target", choices=TARGETS, action="append", help="Only run these targets, repeatable")
+    parser.add_argument("--iterations", type=int, default=200, help="Calls per state with the draft parsed in memory")
+    parser.add_argument(
+        "--cold-iterations", type=int, default=5, help="Calls per state without the parsed draft in memory"
+    )
+    parser.add_argument("--patterns", type=int, default=8, help="Class patterns to rotate through per draft")
+    parser.add_argument("--output", type=Path, default=Path("benchmark.json"), help="Where to write the results")
+    parser.add_argument("--baseline", type=Path, help="Earlier results to compare with, exiting 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed slowdown against the baseline")
+    parser.add_argument("--case", nargs=2, metavar=("TARGET", "DRAFT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        target, draft = args.case
+        if target == "endpoint":
+            result = bench_endpoint(Path(draft), args.iterations, args.patterns)
+        else:
+            result = bench_extraction(Path(draft), args.iterations, args.cold_iterations, args.patterns)
+        print(json.dumps(result))
+        return
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    sources = args.drafts or sorted(
+        path for path in DRAFTS_FOLDER.glob("*.xlsx") if not path.name.startswith(("~$", "."))
+    )
+    drafts = [(draft, 1) for draft in sources]
+    for scale in args.scale:
+        drafts += [(draft, scale) for draft in generate_synthetic_drafts(sources, args.synthetic_folder, [scale])]
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="easechaos-snapshots-") as snapshots_folder:
+        for draft, scale in drafts:
+            for target in args.target or TARGETS:
+                logger.info(f"Benchmarking {target} on {draft.name}")
+                result = {
+                    "draft": draft.stem,
+                    "kind": "lecture" if extract_lectures_table.is_lecture_workbook(str(draft)) else "exam",
+                    "scale": scale,
+                    "size_bytes": draft.stat().st_size,
+                    **run_case(target, draft, args, snapshots_folder),
+                }
+                results.append(result)
+                for state, summary in result.get("states", {}).items():
+                    logger.info(
+                        f"  {state:<14} p50 {summary['p50_ms']:>10.3f} ms  p99 {summary['p99_ms']:>10.3f} ms  "
+                        f"{summary['throughput_per_s']:>9.1f}/s"
+                    )
+
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "spreadsheet_engine": settings.SPREADSHEET_ENGINE,
+        "results": results,
+    }
+    args.output.write_text(json.dumps(report, indent=2))
+    logger.info(f"Results written to {args.output}")
+
+    failed = [result for result in results if "error" in result]
+    regressions = []
+    if args.baseline:
+        regressions = find_regressions(results, json.loads(args.baseline.read_text()), args.tolerance)
+        for regression in regressions:
+            logger.error(f"Regression: {regression}")
+
+    if failed or regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
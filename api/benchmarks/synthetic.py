@@ -0,0 +1,194 @@
+import argparse
+import logging
+import os
+import re
+from pathlib import Path
+
+import openpyxl
+from openpyxl.worksheet.cell_range import CellRange
+from openpyxl.worksheet.worksheet import Worksheet
+
+from api.extract.extract_lectures_table import is_lecture_workbook
+from api.extract.readers import read_merged_ranges
+
+logger = logging.getLogger(__name__)
+
+_TIME_SLOT_PATTERN = re.compile(r"^\d{1,2}:\d{1,2}\s*-\s*\d{1,2}:\d{1,2}$")
+
+# Merged ranges starting in column A at least this wide are notes below the table, not cells
+_FOOTER_MIN_COLUMNS = 3
+
+
+def _find_table_start(rows: list[tuple], is_lecture: bool) -> int | None:
+    """Index of the last header row: the time slots of a lecture sheet, the column names of an exam sheet."""
+    for index, row in enumerate(rows):
+        values = [str(value).strip() for value in row if value is not None]
+        if is_lecture and any(_TIME_SLOT_PATTERN.match(value) for value in values):
+            return index
+        if not is_lecture and "DATE" in (value.upper() for value in values):
+            return index
+    return None
+
+
+def _find_label_column(header: tuple, is_lecture: bool) -> int | None:
+    """The column naming where a slot takes place, which copies of a row are told apart by."""
+    if is_lecture:
+        return 0
+    for index, value in enumerate(header):
+        if value is not None and "HALL" in str(value).upper():
+            return index
+    return None
+
+
+def _merge(sheet: Worksheet, min_col: int, min_row: int, max_col: int, max_row: int):
+    """
+    Merge a range known not to overlap any other, as it is saved.
+
+    Worksheet.merge_cells checks every new range against all earlier ones and
+    restyles its cells, which takes hours for the merged cells of a 100x draft.
+    Only the range itself is written to the file, so that is all that is kept.
+    """
+    sheet.merged_cells.ranges.add(CellRange(min_col=min_col, min_row=min_row, max_col=max_col, max_row=max_row))
+
+
+def _trim(row: tuple) -> tuple:
+    """Drop a row's trailing empty cells, which sheets formatted beyond their table have plenty of."""
+    end = len(row)
+    while end and row[end - 1] is None:
+        end -= 1
+    return row[:end]
+
+
+def scale_sheet(
+    rows: list[tuple], merged: list[tuple[int, int, int, int]], destination: Worksheet, factor: int, is_lecture: bool
+):
+    """
+    Copy a sheet, repeating its table rows and their merged cells factor times.
+
+    The header and the notes below the table are copied once. Copies of a row
+    get their room (or exam hall) suffixed with the copy number, so a class has
+    factor times as many slots, in factor times as many rooms.
+
+    Args:
+        rows: Cell values of a sheet of a real draft, without trailing empty cells
+        merged: Merged ranges of the sheet, as (min_col, min_row, max_col, max_row)
+        destination: Empty sheet to write to
+        factor: How many copies of the table to write
+        is_lecture: Whether the sheet is a lecture day rather than an exam list
+    """
+    table_start = _find_table_start(rows, is_lecture)
+    if table_start is None:
+        for row in rows:
+            destination.append(row)
+        for bounds in merged:
+            _merge(destination, *bounds)
+        return
+
+    # Row indexes below are 0-based, merged range bounds 1-based
+    footer_start = min(
+        (
+            min_row - 1
+            for min_col, min_row, max_col, _ in merged
+            if min_col == 1 and min_row - 1 > table_start and max_col - min_col + 1 >= _FOOTER_MIN_COLUMNS
+        ),
+        default=len(rows),
+    )
+    table_end = footer_start
+    # Sheets are often formatted far below their last row, leave the blank rows out
+    while table_end > table_start + 1 and not rows[table_end - 1]:
+        table_end -= 1
+
+    body = rows[table_start + 1 : table_end]
+    label_column = _find_label_column(rows[table_start], is_lecture)
+
+    for row in rows[: table_start + 1]:
+        destination.append(row)
+    for copy in range(factor):
+        for row in body:
+            if copy and label_column is not None and len(row) > label_column and row[label_column] is not None:
+                row = row[:label_column] + (f"{row[label_column]}-{copy + 1}",) + row[label_column + 1 :]
+            destination.append(row)
+    for row in rows[footer_start:]:
+        destination.append(row)
+
+    footer_shift = table_start + 1 + factor * len(body) - footer_start
+    for min_col, min_row, max_col, max_row in merged:
+        if min_row - 1 <= table_start:
+            shifts = [0]
+        elif min_row - 1 < table_end:
+            shifts = [copy * len(body) for copy in range(factor)]
+        elif min_row - 1 >= footer_start:
+            shifts = [footer_shift]
+        else:
+            continue
+        for shift in shifts:
+            _merge(destination, min_col, min_row + shift, max_col, max_row + shift)
+
+
+def scale_draft(source: str | Path, destination: str | Path, factor: int) -> Path:
+    """
+    Write a synthetic draft with factor times the rooms, slots and merged cells of a real one.
+
+    Every lecture day sheet is scaled; of an exam draft only the first sheet,
+    the one the exam timetable is read from.
+
+    Args:
+        source: Path of a lecture or exam draft
+        destination: Path of the .xlsx file to write
+        factor: How many copies of each table to write, e.g. 10 or 100
+
+    Returns:
+        The destination path
+    """
+    is_lecture = is_lecture_workbook(str(source))
+    merged_ranges = read_merged_ranges(source)
+    workbook = openpyxl.load_workbook(source, read_only=True)
+    scaled = openpyxl.Workbook()
+    scaled.remove(scaled.active)
+
+    for position, sheet in enumerate(workbook.worksheets):
+        rows = [_trim(row) for row in sheet.iter_rows(values_only=True)]
+        scale = factor if is_lecture or position == 0 else 1
+        scale_sheet(rows, merged_ranges.get(sheet.title, []), scaled.create_sheet(sheet.title), scale, is_lecture)
+    workbook.close()
+
+    destination = Path(destination)
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    scaled.save(destination)
+    return destination
+
+
+def generate_synthetic_drafts(sources: list[Path], folder: str | Path, factors: list[int]) -> list[Path]:
+    """
+    Scale every source draft by every factor, e.g. Draft_1.xlsx to Draft_1_x10.xlsx.
+
+    Drafts already generated from the same source are reused.
+
+    Returns:
+        Paths of the synthetic drafts
+    """
+    drafts = []
+    for source in sources:
+        for factor in factors:
+            destination = Path(folder) / f"{source.stem}_x{factor}.xlsx"
+            if not destination.exists() or destination.stat().st_mtime < source.stat().st_mtime:
+                logger.info(f"Generating {destination.name}")
+                scale_draft(source, destination, factor)
+            drafts.append(destination)
+    return drafts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic drafts by scaling real ones.")
+    parser.add_argument("sources", nargs="+", type=Path, help="Drafts to scale")
+    parser.add_argument("--factor", type=int, action="append", help="Scale factor, repeatable (default: 10 and 100)")
+    parser.add_argument("--out", type=Path, default=Path("synthetic_drafts"), help="Folder to write the drafts to")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    for draft in generate_synthetic_drafts(args.sources, args.out, args.factor or [10, 100]):
+        print(f"{draft} ({os.path.getsize(draft) // 1024} KiB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,15 @@
 import redis
+import redis.asyncio as aioredis
 from dotenv import load_dotenv
 from pydantic_settings import BaseSettings
+import asyncio
 import logging
-import os
-import hashlib
+import uuid
+from pathlib import Path
+
+from api.services.fingerprint import get_file_hash
+from api.services.memory_cache import MemoryCache
+from api.services.metrics import inc, span
 
 load_dotenv()
 
@@ -13,6 +19,23 @@ class Settings(BaseSettings):
     REDIS_HOST: str
     REDIS_PORT: int
     REDIS_PASSWORD: str
+    REDIS_POOL_SIZE: int = 50
+    EXTRACTION_WORKERS: int = 0  # 0 means one per CPU core
+    EXTRACTION_QUEUE_SIZE: int = 32
+    EXTRACTION_RETRY_AFTER: int = 5
+    EXTRACTION_LOCK_TIMEOUT: int = 30
+    L1_CACHE_MAX_ENTRIES: int = 512
+    L1_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    L1_CACHE_TTL: int = 3600
+    SPREADSHEET_ENGINE: str = "calamine"  # falls back to openpyxl
+    WARMUP_ENABLED: bool = True
+    WARMUP_BATCH_SIZE: int = 25
+    WARMUP_POLL_INTERVAL: int = 2  # seconds, when inotify is unavailable
+    WARMUP_LOCK_TIMEOUT: int = 600  # seconds other API workers leave a draft version to the one warming it
+    PROFILING_TOKEN: str = ""  # empty disables request profiling
+    PROFILING_TOP_N: int = 10
+    PROFILES_FOLDER: str = ""  # where to dump .pstats files, empty to not keep them
+    SNAPSHOTS_FOLDER: str = ""  # where to keep parsed drafts, empty for api/snapshots
     PORT: int = 80
 
     class Config:
@@ -20,80 +43,248 @@ class Settings(BaseSettings):
 
 settings = Settings()
 
-def get_redis_connection():
+DRAFTS_FOLDER = Path(__file__).parents[1] / "drafts"
+SNAPSHOTS_FOLDER = Path(settings.SNAPSHOTS_FOLDER or Path(__file__).parents[1] / "snapshots")
+
+def get_redis_connection() -> aioredis.Redis:
+    """
+    Create an asyncio Redis client backed by a bounded connection pool.
+
+    Responses are cached as ready-to-send bytes, so values are not decoded.
+    """
     try:
-        logger.info("Redis connection established")
-        return redis.Redis(
+        pool = aioredis.ConnectionPool(
             host=settings.REDIS_HOST,
             port=settings.REDIS_PORT,
             password=settings.REDIS_PASSWORD,
             db=0,
-            ssl=False,
-            decode_responses=True,
+            decode_responses=False,
             socket_timeout=5,
             retry_on_timeout=True,
+            max_connections=settings.REDIS_POOL_SIZE,
         )
+        return aioredis.Redis(connection_pool=pool)
 
-    except redis.ConnectionError as e:
-        logger.error(f"Redis connection failed: {e}")
-        raise
     except Exception as e:
-        logger.error(f"Unexpected error connecting to Redis: {e}")
+        logger.error(f"Unexpected error creating Redis client: {e}")
         raise
 
-r = get_redis_connection()
+r: aioredis.Redis | None = None
+
+# Per-worker L1 in front of Redis, keyed by the same content-addressed keys
+l1_cache = MemoryCache(
+    max_entries=settings.L1_CACHE_MAX_ENTRIES,
+    max_bytes=settings.L1_CACHE_MAX_BYTES,
+    ttl=settings.L1_CACHE_TTL,
+)
+
+async def open_redis_connection():
+    """Create the shared Redis client. Called from the FastAPI lifespan."""
+    global r
+    r = get_redis_connection()
+    logger.info(f"Redis connection pool created (max {settings.REDIS_POOL_SIZE} connections)")
 
-def create_cache_key_from_parameters(filename: str, class_pattern: str, is_exam: bool) -> str:
-    """Generate a consistent cache key including the timetable type."""
-    return f"{filename}-{class_pattern.replace(' ', '')}-{'exam' if is_exam else 'lecture'}"
+async def close_redis_connection():
+    """Close the shared Redis client and its pool on shutdown."""
+    global r
+    if r is not None:
+        await r.aclose()
+        await r.connection_pool.disconnect()
+        r = None
 
-def get_table_from_cache(filename: str, class_pattern: str, is_exam: bool) -> str | None:
+def create_cache_key_from_parameters(filename: str, class_pattern: str, is_exam: bool, version: str) -> str:
     """
-    Get a timetable (lecture or exam) from the cache.
+    Generate a content-addressed cache key including the draft version and timetable type.
+
+    Embedding the draft hash means a cached entry is valid for as long as it exists,
+    so entries carry no TTL and are only removed by eviction or version cleanup.
     """
+    return f"{filename}:{version}:{class_pattern.replace(' ', '')}-{'exam' if is_exam else 'lecture'}"
+
+def _current_version_key(filename: str) -> str:
+    return f"{filename}:current"
+
+async def _is_current_version(filename: str, version: str) -> bool:
+    """Check a version against the draft's content now, a memoized stat unless the draft changed."""
     try:
-        # Normalize filename to match what’s used elsewhere
-        base_filename = filename.replace(".xlsx", "")
-        file_path = os.path.join("api/drafts", f"{base_filename}.xlsx")
-        with open(file_path, "rb") as f:
-            current_hash = hashlib.md5(f.read()).hexdigest()
+        return await asyncio.to_thread(get_file_hash, DRAFTS_FOLDER / f"{filename}.xlsx") == version
+    except FileNotFoundError:
+        return False
 
-        cache_key = create_cache_key_from_parameters(base_filename, class_pattern, is_exam)
-        hash_key = f"{cache_key}_hash"
+async def get_table_from_cache(filename: str, class_pattern: str, is_exam: bool, version: str) -> bytes | None:
+    """
+    Get a serialized timetable (lecture or exam) response from the cache.
 
-        cached_hash = r.get(hash_key)
-        cached_data = r.get(cache_key)
+    The in-process L1 cache is checked first; Redis hits are copied into it.
+    """
+    tables = await get_tables_from_cache(filename, version, [(class_pattern, is_exam)])
+    return tables[(class_pattern, is_exam)]
 
-        if cached_hash and cached_data and cached_hash == current_hash:
-            return cached_data
-        return None
+async def get_tables_from_cache(
+    filename: str, version: str, queries: list[tuple[str, bool]]
+) -> dict[tuple[str, bool], bytes | None]:
+    """
+    Get several serialized timetables of one draft version in a single round trip.
 
+    Args:
+        filename: Draft name without extension
+        version: Content hash of the draft
+        queries: (class_pattern, is_exam) pairs to look up
+
+    Returns:
+        The cached bytes (or None) for every query
+    """
+    base_filename = filename.replace(".xlsx", "")
+    keys = {
+        query: create_cache_key_from_parameters(base_filename, query[0], query[1], version)
+        for query in queries
+    }
+
+    tables = {query: l1_cache.get(key) for query, key in keys.items()}
+    missing = [query for query, table in tables.items() if table is None]
+    inc("easechaos_cache_lookups_total", len(tables) - len(missing), layer="l1", result="hit")
+    inc("easechaos_cache_lookups_total", len(missing), layer="l1", result="miss")
+    if not missing:
+        return tables
+
+    if r is None:
+        logger.warning("Redis is not connected; skipping cache lookup")
+        return tables
+
+    try:
+        with span("redis_get"):
+            cached = await r.mget([keys[query] for query in missing])
     except redis.RedisError as e:
         logger.error(f"Error retrieving from cache: {e}")
-        return None
-    except FileNotFoundError as e:
-        logger.error(f"File not found for cache check: {e}")
-        return None
+        inc("easechaos_cache_lookups_total", len(missing), layer="redis", result="error")
+        return tables
+
+    for query, cached_data in zip(missing, cached):
+        if cached_data is not None:
+            l1_cache.set(keys[query], cached_data)
+            tables[query] = cached_data
+    hits = sum(cached_data is not None for cached_data in cached)
+    inc("easechaos_cache_lookups_total", hits, layer="redis", result="hit")
+    inc("easechaos_cache_lookups_total", len(missing) - hits, layer="redis", result="miss")
 
-def add_table_to_cache(table: str, filename: str, class_pattern: str, is_exam: bool, expire_seconds: int = 3600):
+    return tables
+
+async def add_table_to_cache(table: bytes, filename: str, class_pattern: str, is_exam: bool, version: str):
     """
-    Add a timetable (lecture or exam) to the cache.
+    Add a serialized timetable (lecture or exam) response to the cache.
+
+    The first write for a new draft version removes the entries of the version it replaces.
     """
-    try:
-        base_filename = filename.replace(".xlsx", "")
-        file_path = os.path.join("api/drafts", f"{base_filename}.xlsx")
-        with open(file_path, "rb") as f:
-            current_hash = hashlib.md5(f.read()).hexdigest()
+    await add_tables_to_cache(filename, version, {(class_pattern, is_exam): table})
 
-        cache_key = create_cache_key_from_parameters(base_filename, class_pattern, is_exam)
-        hash_key = f"{cache_key}_hash"
+async def add_tables_to_cache(
+    filename: str, version: str, tables: dict[tuple[str, bool], bytes]
+):
+    """
+    Add several serialized timetables of one draft version in a single pipeline.
 
-        pipe = r.pipeline()
-        pipe.setex(cache_key, expire_seconds, table)
-        pipe.setex(hash_key, expire_seconds, current_hash)
-        pipe.execute()
+    Timetables of a version the draft no longer has (e.g. from an extraction
+    that was still running when the draft changed) are kept out of Redis: the
+    first write of the current version has already removed the older ones.
+
+    Args:
+        filename: Draft name without extension
+        version: Content hash of the draft
+        tables: Serialized responses keyed by (class_pattern, is_exam)
+    """
+    base_filename = filename.replace(".xlsx", "")
+    keys = {
+        query: create_cache_key_from_parameters(base_filename, query[0], query[1], version)
+        for query in tables
+    }
+    for query, table in tables.items():
+        l1_cache.set(keys[query], table)
+
+    if r is None:
+        logger.warning("Redis is not connected; skipping cache write")
+        return
+
+    # A late write must neither bring back a superseded version nor delete the newer one's entries
+    if not await _is_current_version(base_filename, version):
+        logger.info(f"Not caching {len(tables)} timetables of superseded {base_filename} version {version}")
+        return
+
+    try:
+        async with r.pipeline() as pipe:
+            pipe.mset({keys[query]: table for query, table in tables.items()})
+            pipe.set(_current_version_key(base_filename), version, get=True)
+            _, previous_version = await pipe.execute()
+
+        if previous_version and previous_version.decode() != version:
+            await delete_draft_version(base_filename, previous_version.decode())
 
     except redis.RedisError as e:
         logger.error(f"Error adding to cache: {e}")
-    except FileNotFoundError as e:
-        logger.error(f"File not found for cache addition: {e}")
+
+async def delete_draft_version(filename: str, version: str) -> int:
+    """Delete every cached timetable of a superseded draft version."""
+    if r is None:
+        return 0
+
+    deleted = 0
+    try:
+        batch = []
+        async for key in r.scan_iter(match=f"{filename}:{version}:*", count=500):
+            batch.append(key)
+            if len(batch) >= 500:
+                deleted += await r.unlink(*batch)
+                batch = []
+        if batch:
+            deleted += await r.unlink(*batch)
+    except redis.RedisError as e:
+        logger.error(f"Error deleting cached version {version} of {filename}: {e}")
+
+    logger.info(f"Deleted {deleted} cached timetables for superseded {filename} version {version}")
+    return deleted
+
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+async def acquire_lock(name: str, timeout: int) -> str | None:
+    """
+    Try to take a short-lived lock shared by every API worker and container.
+
+    Returns a token to release the lock with, or None if someone else holds it.
+    If Redis is unavailable the caller gets a token and proceeds unlocked.
+    """
+    token = uuid.uuid4().hex
+    if r is None:
+        return token
+
+    try:
+        if await r.set(f"lock:{name}", token, nx=True, ex=timeout):
+            return token
+        return None
+    except redis.RedisError as e:
+        logger.error(f"Error acquiring lock {name}: {e}")
+        return token
+
+async def is_locked(name: str) -> bool:
+    """Check whether a lock taken with acquire_lock is still held."""
+    if r is None:
+        return False
+
+    try:
+        return bool(await r.exists(f"lock:{name}"))
+    except redis.RedisError as e:
+        logger.error(f"Error checking lock {name}: {e}")
+        return False
+
+async def release_lock(name: str, token: str):
+    """Release a lock, but only if it is still held with the given token."""
+    if r is None:
+        return
+
+    try:
+        await r.eval(_RELEASE_LOCK_SCRIPT, 1, f"lock:{name}", token)
+    except redis.RedisError as e:
+        logger.error(f"Error releasing lock {name}: {e}")
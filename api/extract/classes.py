@@ -0,0 +1,52 @@
+import re
+from typing import NamedTuple
+
+# Departments followed by a year digit and a course number, section or nothing,
+# e.g. "CE 451", "MA, CE, RP 460", "CE 4A" or "NG 4"
+_CLASS_MENTION_PATTERN = re.compile(r"\b((?:[A-Z]{2,3}\s*[,/]\s*)*[A-Z]{2,3})\s*(\d)(\d{2}|[A-Z])?\b")
+# More sections of the same year after a section, e.g. the ", 4B" of "CE 4A, 4B"
+_SECTION_TAIL_PATTERN = re.compile(r"\s*,\s*(\d)([A-Z])\b")
+_DEPARTMENT_PATTERN = re.compile(r"[A-Z]{2,3}")
+
+
+class ClassMention(NamedTuple):
+    """A class, section or course code found in a timetable, with the class pattern it belongs to."""
+
+    kind: str  # "class", "section" or "course"
+    name: str
+    class_pattern: str
+
+
+def parse_class_mentions(text: str) -> set[ClassMention]:
+    """
+    Find every class, section and course code mentioned in a timetable cell.
+
+    Args:
+        text: Cell text, e.g. "MA, CE 451 UMARU" or "CE 4A, 4B"
+
+    Returns:
+        The mentions, each with its class pattern (e.g. "CE 4")
+    """
+    mentions = set()
+    text = text.upper()
+    for match in _CLASS_MENTION_PATTERN.finditer(text):
+        departments, year, suffix = match.groups()
+
+        sections = []
+        if suffix and not suffix.isdigit():
+            sections.append(suffix)
+            position = match.end()
+            while tail := _SECTION_TAIL_PATTERN.match(text, position):
+                if tail[1] == year:
+                    sections.append(tail[2])
+                position = tail.end()
+
+        for department in _DEPARTMENT_PATTERN.findall(departments):
+            class_pattern = f"{department} {year}"
+            mentions.add(ClassMention("class", class_pattern, class_pattern))
+            if suffix and suffix.isdigit():
+                mentions.add(ClassMention("course", f"{class_pattern}{suffix}", class_pattern))
+            for section in sections:
+                mentions.add(ClassMention("section", f"{class_pattern}{section}", class_pattern))
+
+    return mentions
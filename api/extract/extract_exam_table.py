@@ -1,4 +1,24 @@
+import hashlib
+import json
+import logging
+import os
+import re
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from datetime import date, datetime, time, timezone
+
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+from icalendar import Calendar, Event
+
+from api.extract.classes import ClassMention, parse_class_mentions
+from api.extract.readers import read_excel
+from api.extract.snapshots import read_snapshot, write_snapshot
+from api.services.fingerprint import get_file_hash
+from api.services.metrics import inc, span
+
+logger = logging.getLogger(__name__)
 
 PERIOD_MAPPING = {
     "M": ("7:00 AM", "10:00 AM"),
@@ -18,6 +38,51 @@ COLUMN_ALIASES = {
 }
 
 
+def exams_convert_to_24hour(time_str: str) -> str:
+    """
+    Convert exam time to 24-hour format with explicit AM/PM markers.
+
+    Exam timetables include explicit AM/PM markers, so conversion is straightforward:
+    - AM times: 12:00 AM → 00:00, other AM times stay the same
+    - PM times: Add 12 hours (except 12:00 PM)
+
+    Parameters:
+    time_str (str): Time string with AM/PM marker (e.g., "9:00 AM", "2:00 PM")
+
+    Returns:
+    str: Time string in 24-hour format "HH:MM"
+
+    Raises:
+    ValueError: If time string is empty or malformed
+    """
+    if not time_str or not time_str.strip():
+        raise ValueError("Time string cannot be empty")
+
+    try:
+        time_str = time_str.strip().upper()
+        is_pm = "PM" in time_str
+        time_clean = time_str.replace("AM", "").replace("PM", "").strip()
+        hours, minutes = map(int, time_clean.split(":"))
+
+        # Convert to 24-hour format
+        if is_pm and hours != 12:
+            hours += 12
+        elif not is_pm and hours == 12:
+            hours = 0
+
+        return f"{hours:02d}:{minutes:02d}"
+    except ValueError as e:
+        logger.error(f"Error converting time: {time_str} - {e}")
+        raise
+
+
+# Every START/END a period can map to, converted once rather than per exam
+PERIOD_TIMES_24H = {time: exams_convert_to_24hour(time) for times in PERIOD_MAPPING.values() for time in times}
+
+_EXAM_TIMETABLE_CACHE_SIZE = 8
+_exam_timetables: "OrderedDict[str, pd.DataFrame]" = OrderedDict()
+
+
 def _find_header_row(df: pd.DataFrame) -> int:
     for index in range(len(df)):
         row = [str(value).strip() for value in df.iloc[index].tolist()]
@@ -55,18 +120,103 @@ def _convert_exam_dates(date_series: pd.Series) -> pd.Series:
     return pd.to_datetime(date_series, errors="coerce")
 
 
-def get_exam_timetable(filename, class_pattern) -> pd.DataFrame:
+def _format_date_with_suffix(timestamp):
+    day = timestamp.day
+    suffix = (
+        "th" if 11 <= day <= 13 else {1: "st", 2: "nd", 3: "rd"}.get(day % 10, "th")
+    )
+    return timestamp.strftime(f"%A, {day}{suffix} %B %Y")
+
+
+def _parse_formatted_date(text: str) -> date:
+    """Read back a date written by _format_date_with_suffix, e.g. 'Tuesday, 7th April 2026'."""
+    return datetime.strptime(re.sub(r"(\d+)(st|nd|rd|th)", r"\1", text), "%A, %d %B %Y").date()
+
+
+def _exams_to_table(df: pd.DataFrame) -> pa.Table:
+    """Lay out categorized exam rows as an Arrow table of typed, dictionary-encoded columns."""
+    df = df.copy()
+    for column in df.columns:
+        # Arrow columns hold one type: cells of a column mixing e.g. ints and strings (NO.) are stored as text
+        if pd.api.types.infer_dtype(df[column], skipna=True) in ("mixed", "mixed-integer"):
+            values = df[column]
+            df[column] = values.where(values.isna(), values.astype(str))
+    return pa.Table.from_pandas(df, preserve_index=True)
+
+
+def _exams_from_table(table: pa.Table) -> pd.DataFrame:
+    """Rebuild categorized exam rows from their Arrow table, categoricals included."""
+    df = table.to_pandas()
+    # Arrow nulls of text columns come back as None, the Excel reader leaves missing cells NaN
+    for column in df.columns[df.dtypes == object]:
+        df[column] = df[column].fillna(np.nan)
+    return df
+
+
+def _categorize_columns(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Process an examination timetable Excel file and return a filtered DataFrame.
+    Store CLASS, DATE, START and END as categoricals.
+
+    CLASS categories are the draft's class names in sorted order, so a prefix
+    filter is a binary search over them instead of a string test per row.
+    DATE categories are in calendar order, so their codes sort exams by day.
+    """
+    if "CLASS" in df.columns:
+        classes = df["CLASS"]
+        df["CLASS"] = pd.Categorical(classes.where(classes.isna(), classes.astype(str)))
+    days = sorted(df["DATE"].unique(), key=_parse_formatted_date)
+    df["DATE"] = pd.Categorical(df["DATE"], categories=days)
+    for column in ["START", "END"]:
+        df[column] = pd.Categorical(df[column])
+    return df
+
+
+def _load_exam_timetable(filename, content_hash: str) -> pd.DataFrame:
+    """Load normalized exam rows from their on-disk snapshot, reading the file only if there is none."""
+    table = read_snapshot(filename, content_hash, "exams")
+    if table is not None:
+        logger.info(f"Loaded exam snapshot for {filename}")
+        inc("easechaos_snapshot_loads_total", kind="exams")
+        with span("load_snapshot"):
+            return _exams_from_table(table)
+
+    inc("easechaos_draft_parses_total", draft=os.path.basename(filename).removesuffix(".xlsx"), kind="exams")
+    with span("parse_draft"):
+        df = _categorize_columns(_read_exam_timetable(filename))
+    write_snapshot(filename, content_hash, "exams", lambda: _exams_to_table(df))
+    return df
+
+
+def load_exam_timetable(filename) -> pd.DataFrame:
+    """
+    Read and normalize every row of an examination timetable Excel file.
+
+    The normalized rows are kept in memory and snapshotted to disk by file
+    content, so a fresh process memory-maps them instead of reading the Excel
+    file again. Treat the returned DataFrame as read-only, it is shared.
 
     Parameters:
     filename (str): Path to the Excel file
-    class_pattern (str): Pattern to filter classes (e.g., 'CE 4')
 
     Returns:
-    pd.DataFrame: Processed and filtered timetable DataFrame
+    pd.DataFrame: Normalized timetable for all classes, ready for filter_exam_timetable
     """
-    raw_df = pd.read_excel(filename, sheet_name=0, header=None)
+    content_hash = get_file_hash(filename)
+
+    df = _exam_timetables.get(content_hash)
+    if df is None:
+        df = _load_exam_timetable(filename, content_hash)
+        _exam_timetables[content_hash] = df
+        if len(_exam_timetables) > _EXAM_TIMETABLE_CACHE_SIZE:
+            _exam_timetables.popitem(last=False)
+    else:
+        _exam_timetables.move_to_end(content_hash)
+
+    return df
+
+
+def _read_exam_timetable(filename) -> pd.DataFrame:
+    raw_df = read_excel(filename, sheet_name=0)
 
     header_row = _find_header_row(raw_df)
     df = raw_df.iloc[header_row:].reset_index(drop=True)
@@ -82,28 +232,280 @@ def get_exam_timetable(filename, class_pattern) -> pd.DataFrame:
     df[period_col] = df[period_col].astype(str).str.strip()
     df = df[df[period_col].isin(PERIOD_MAPPING.keys())]
 
-    if df.empty:
-        # No valid PERIOD/SESSION rows; propagate an empty result without raising.
-        df["START"] = pd.Series(dtype=object)
-        df["END"] = pd.Series(dtype=object)
-    else:
-        df["START"], df["END"] = zip(*df[period_col].map(PERIOD_MAPPING))
+    df["START"] = df[period_col].map({code: start for code, (start, _) in PERIOD_MAPPING.items()}).astype(object)
+    df["END"] = df[period_col].map({code: end for code, (_, end) in PERIOD_MAPPING.items()}).astype(object)
     df = df.drop(columns=[period_col])
 
-    def format_date_with_suffix(date):
-        day = date.day
-        suffix = (
-            "th" if 11 <= day <= 13 else {1: "st", 2: "nd", 3: "rd"}.get(day % 10, "th")
-        )
-        return date.strftime(f"%A, {day}{suffix} %B %Y")
+    dates = _convert_exam_dates(df["DATE"])
+    df = df[dates.notna()].copy()
+    dates = dates[dates.notna()]
+    # An exam week has a handful of dates, format each of them once
+    df["DATE"] = dates.map({day: _format_date_with_suffix(day) for day in dates.unique()}).astype(object)
+
+    return df
+
+
+def _class_prefix_mask(classes: pd.Series, class_pattern: str) -> np.ndarray:
+    """Select the rows whose class starts with the pattern, by binary search over the sorted categories."""
+    categories = classes.cat.categories
+    first = categories.searchsorted(class_pattern, side="left")
+    if class_pattern:
+        # Every string with the prefix sorts before the prefix with its last character incremented
+        last = categories.searchsorted(class_pattern[:-1] + chr(ord(class_pattern[-1]) + 1), side="left")
+    else:
+        last = len(categories)
+
+    codes = classes.cat.codes.to_numpy()
+    return (codes >= first) & (codes < last)
+
 
-    df["DATE"] = _convert_exam_dates(df["DATE"])
-    df = df[df["DATE"].notna()].copy()
-    df["DATE"] = df["DATE"].apply(format_date_with_suffix)
+def filter_exam_timetable(df: pd.DataFrame, class_pattern) -> pd.DataFrame:
+    """
+    Filter a normalized examination timetable down to one class.
+
+    Parameters:
+    df (pd.DataFrame): Timetable returned by load_exam_timetable
+    class_pattern (str): Pattern to filter classes (e.g., 'CE 4')
 
-    filtered_df = df[df["CLASS"].astype(str).str.startswith(class_pattern)].copy()
+    Returns:
+    pd.DataFrame: Filtered timetable DataFrame
+    """
+    filtered_df = df[_class_prefix_mask(df["CLASS"], class_pattern)].copy()
 
     if "NO" in filtered_df.columns:
         filtered_df = filtered_df.drop(columns=["NO"])
 
     return filtered_df
+
+
+# Slot fields and the normalized columns they are read from
+EXAM_SLOT_FIELDS = {
+    "value": "COURSE NAME",
+    "class": "CLASS",
+    "location": "LECTURE HALL",
+    "invigilator": "INVIGILATOR (UPDATED)",
+}
+
+
+def _column_values(df: pd.DataFrame, column: str) -> list:
+    """A column's values as JSON-ready Python objects, None for missing cells and "" for a missing column."""
+    if column not in df.columns:
+        return [""] * len(df)
+    values = df[column].astype(object)
+    return values.where(values.notna(), None).tolist()
+
+
+def shape_exam_slots(df: pd.DataFrame) -> list[dict]:
+    """
+    Turn filtered exam rows into one dated entry per exam, in 24-hour time.
+
+    Parameters:
+    df (pd.DataFrame): Timetable returned by filter_exam_timetable
+
+    Returns:
+    list[dict]: Entries of {"day": date, "data": [slot]}, in row order
+    """
+    starts = df["START"].map(PERIOD_TIMES_24H).astype(object).tolist()
+    ends = df["END"].map(PERIOD_TIMES_24H).astype(object).tolist()
+    fields = {field: _column_values(df, column) for field, column in EXAM_SLOT_FIELDS.items()}
+
+    table_data = []
+    for row, day in enumerate(df["DATE"].tolist()):
+        slot = {"start": starts[row], "end": ends[row]}
+        slot.update((field, values[row]) for field, values in fields.items())
+        table_data.append({"day": day, "data": [slot]})
+
+    return table_data
+
+
+class ExamDateIndex:
+    """
+    The exams of one class prefix, shaped for the endpoint and sorted by date and start time.
+
+    Each exam's date is kept as its position in the draft's calendar of exam
+    days, so date ranges and "next exams" are binary searches over the exams.
+    """
+
+    def __init__(self, df: pd.DataFrame, class_pattern: str):
+        filtered_df = filter_exam_timetable(df, class_pattern)
+        day_codes = filtered_df["DATE"].cat.codes.to_numpy()
+        starts = filtered_df["START"].map(PERIOD_TIMES_24H).astype(str).to_numpy()
+        # lexsort is stable, so exams at the same time keep their workbook order
+        order = np.lexsort((starts, day_codes))
+
+        self.calendar = [_parse_formatted_date(day) for day in df["DATE"].cat.categories]
+        self.slots = shape_exam_slots(filtered_df.iloc[order])
+        self.day_codes = day_codes[order]
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def query(
+        self, date_from: date | None = None, date_to: date | None = None, limit: int | None = None
+    ) -> list[dict]:
+        """
+        Exams between two dates, both inclusive, in date order.
+
+        Parameters:
+        date_from (date): First day, or None for the first exam
+        date_to (date): Last day, or None for the last exam
+        limit (int): Return at most this many exams, the earliest ones
+
+        Returns:
+        list[dict]: The matching exams, see shape_exam_slots
+        """
+        first_day = 0 if date_from is None else bisect_left(self.calendar, date_from)
+        end_day = len(self.calendar) if date_to is None else bisect_right(self.calendar, date_to)
+
+        start = int(np.searchsorted(self.day_codes, first_day, side="left"))
+        stop = int(np.searchsorted(self.day_codes, end_day, side="left"))
+        if limit is not None:
+            stop = min(stop, start + limit)
+
+        return self.slots[start:stop]
+
+
+_EXAM_DATE_INDEX_CACHE_SIZE = 256
+_exam_date_indexes: "OrderedDict[tuple[str, str], ExamDateIndex]" = OrderedDict()
+
+
+def get_exam_date_index(filename, class_pattern) -> ExamDateIndex:
+    """
+    Get the date index of a class's exams, building it once per file content.
+
+    Parameters:
+    filename (str): Path to the Excel file
+    class_pattern (str): Pattern to filter classes (e.g., 'CE 4')
+
+    Returns:
+    ExamDateIndex: The class's exams sorted by date and start time
+    """
+    key = (get_file_hash(filename), class_pattern)
+
+    index = _exam_date_indexes.get(key)
+    if index is None:
+        index = ExamDateIndex(load_exam_timetable(filename), class_pattern)
+        _exam_date_indexes[key] = index
+        if len(_exam_date_indexes) > _EXAM_DATE_INDEX_CACHE_SIZE:
+            _exam_date_indexes.popitem(last=False)
+    else:
+        _exam_date_indexes.move_to_end(key)
+
+    return index
+
+
+@span("exam_slots")
+def get_exam_slots(
+    filename, class_pattern, date_from: date | None = None, date_to: date | None = None, limit: int | None = None
+) -> list[dict]:
+    """
+    Get the exams of a class, shaped for the timetable endpoint.
+
+    Without dates or a limit every exam is returned in workbook order. Otherwise
+    the exams in the date range are returned in date order, at most limit of them.
+
+    Parameters:
+    filename (str): Path to the Excel file
+    class_pattern (str): Pattern to filter classes (e.g., 'CE 4')
+    date_from (date): Only exams on or after this day
+    date_to (date): Only exams on or before this day
+    limit (int): Only the first exams, e.g. 1 for the next exam from date_from
+
+    Returns:
+    list[dict]: One dated entry per exam, see shape_exam_slots
+    """
+    if date_from is None and date_to is None and limit is None:
+        return shape_exam_slots(filter_exam_timetable(load_exam_timetable(filename), class_pattern))
+
+    return get_exam_date_index(filename, class_pattern).query(date_from, date_to, limit)
+
+
+def get_exam_class_patterns(filename) -> list[str]:
+    """
+    List every class pattern in an examination timetable Excel file.
+
+    Parameters:
+    filename (str): Path to the Excel file
+
+    Returns:
+    list[str]: Sorted class patterns such as 'CE 4' that filter_exam_timetable accepts
+    """
+    classes = pd.Series(load_exam_timetable(filename)["CLASS"].cat.categories)
+    return sorted(classes.str.extract(r"^([A-Z]{2,3} \d)", expand=False).dropna().unique())
+
+
+def get_exam_class_mentions(filename) -> set[ClassMention]:
+    """
+    Find every class, section and course code in an examination timetable Excel file.
+
+    Parameters:
+    filename (str): Path to the Excel file
+
+    Returns:
+    set[ClassMention]: Mentions from the CLASS and COURSE NO columns
+    """
+    df = load_exam_timetable(filename)
+
+    mentions = set()
+    for column in ["CLASS", "COURSE NO"]:
+        if column in df.columns:
+            for text in df[column].dropna().astype(str).unique():
+                mentions |= parse_class_mentions(text)
+
+    return mentions
+
+
+def get_exam_timetable(filename, class_pattern) -> pd.DataFrame:
+    """
+    Process an examination timetable Excel file and return a filtered DataFrame.
+
+    Parameters:
+    filename (str): Path to the Excel file
+    class_pattern (str): Pattern to filter classes (e.g., 'CE 4')
+
+    Returns:
+    pd.DataFrame: Processed and filtered timetable DataFrame
+    """
+    return filter_exam_timetable(load_exam_timetable(filename), class_pattern)
+
+
+def generate_exam_calendar(exams: list[dict]) -> bytes:
+    """
+    Generate a calendar with one event per exam.
+
+    The output only depends on the exams: UIDs are derived from each exam and
+    DTSTAMP is the day of the first exam.
+
+    Parameters:
+    exams (list[dict]): The endpoint's exam timetable, see shape_exam_slots
+
+    Returns:
+    bytes: The calendar in iCalendar format
+    """
+    cal = Calendar()
+    cal.add("version", "2.0")
+    cal.add("prodid", "-//Class Schedule Generator//EN")
+
+    days = [_parse_formatted_date(exam["day"]) for exam in exams]
+    stamp = datetime.combine(min(days, default=date(1970, 1, 1)), time(), tzinfo=timezone.utc)
+
+    for day, exam in zip(days, exams):
+        for slot in exam["data"]:
+            start_time = datetime.strptime(slot["start"], "%H:%M").time()
+            end_time = datetime.strptime(slot["end"], "%H:%M").time()
+            uid = hashlib.md5(json.dumps([exam["day"], slot], sort_keys=True).encode()).hexdigest()
+
+            event = Event()
+            event.add("uid", f"{uid}@easechaos")
+            event.add("summary", f"{slot['value'] or ''} ({slot['class'] or ''})")
+            event.add("dtstart", datetime.combine(day, start_time))
+            event.add("dtend", datetime.combine(day, end_time))
+            event.add("dtstamp", stamp)
+            if slot["location"]:
+                event.add("location", str(slot["location"]))
+            if slot["invigilator"]:
+                event.add("description", f"Invigilator: {slot['invigilator']}")
+
+            cal.add_component(event)
+
+    return cal.to_ical()
@@ -1,8 +1,28 @@
-import regex as re
+import hashlib
+import json
+import logging
+import os
+import re
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 from icalendar import Event, Calendar
-from datetime import datetime, timedelta
-import openpyxl
+from datetime import date, datetime, time, timedelta, timezone
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import groupby
+from typing import Iterator, NamedTuple
+
+from api.extract.classes import ClassMention, parse_class_mentions
+from api.extract.readers import read_excel, read_merged_ranges, read_sheet_hashes, read_sheet_names
+from api.extract.snapshots import read_snapshot, write_snapshot
+from api.services.fingerprint import get_file_hash
+from api.services.metrics import inc, span
+
+logger = logging.getLogger(__name__)
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
 
 
 def _get_time_row(df: pd.DataFrame) -> pd.Series:
@@ -24,8 +44,8 @@ def _get_time_row(df: pd.DataFrame) -> pd.Series:
             return row
 
 
-def _get_daily_table(df: pd.DataFrame, class_pattern: str) -> pd.DataFrame:
-    """Get the simplified dataframe for a given class."""
+def _get_daily_table(df: pd.DataFrame) -> pd.DataFrame:
+    """Label a day sheet with its time slots and classrooms, without filtering."""
     df = df.copy()
 
     time_row = _get_time_row(df)
@@ -37,17 +57,27 @@ def _get_daily_table(df: pd.DataFrame, class_pattern: str) -> pd.DataFrame:
     df.set_index("Classroom", inplace=True)
     df = df.iloc[time_row[0] + 1 :]
 
+    return df
+
+
+def _get_class_matcher(class_pattern: str) -> re.Pattern:
+    """Get the compiled regex used to find a class in the timetable cells."""
     dept, year = class_pattern.split()
+    return _compile_class_matcher(dept.upper(), year.upper())
 
+
+@lru_cache(maxsize=256)
+def _compile_class_matcher(dept: str, year: str) -> re.Pattern:
+    """Compile the class regex once per (dept, year); matching is case-insensitive."""
     patterns = [
         # basic pattern (e.g "CE 4", "CE 4A")
         fr"{dept}\s*{year}[A-Z]?",
 
         # multiple sections (e.g "CE 4A, 4B")
-        fr"{dept}\s*{year}[A-Z](\s*,\s*{year}[A-Z])*",
+        fr"{dept}\s*{year}[A-Z](?:\s*,\s*{year}[A-Z])*",
 
         # department with sections combined (e.g "CE 4A, CE 4B")
-        fr"{dept}\s*{year}[A-Z](\s*,\s*{dept}\s*{year}[A-Z])*",
+        fr"{dept}\s*{year}[A-Z](?:\s*,\s*{dept}\s*{year}[A-Z])*",
 
         # course numbers starting with the year number (e.g., CE 459, CE/RN 459)
         fr"{dept}\s*{year}[0-9]{{2}}",
@@ -59,15 +89,35 @@ def _get_daily_table(df: pd.DataFrame, class_pattern: str) -> pd.DataFrame:
         fr"{dept}(?:\s*[,/]\s*[A-Z]{{2,3}})+\s+{year}[0-9]{{2}}"
     ]
 
-    combined_pattern = '|'.join(f'({pattern})' for pattern in patterns)
+    combined_pattern = '|'.join(f'(?:{pattern})' for pattern in patterns)
 
-    df = df.mask(~df.map(lambda x: bool(re.search(combined_pattern, str(x), re.IGNORECASE))))
-    df = df.dropna(how="all")
+    return re.compile(combined_pattern, re.IGNORECASE)
 
-    return df
+
+def _read_sheet(cells: pd.DataFrame, merged_ranges: list[tuple[int, int, int, int]]) -> pd.DataFrame:
+    """
+    Turn a sheet's raw cells into a DataFrame, filling two-column merged cells.
+
+    Only the top-left cell of a merged range keeps its value. For ranges two
+    columns wide (e.g. a two-hour class) the value is also written to the
+    bottom-right cell, as if the range had been unmerged.
+    """
+    n_rows = max([len(cells)] + [max_row for _, _, _, max_row in merged_ranges])
+    n_cols = max([len(cells.columns)] + [max_col for _, _, max_col, _ in merged_ranges])
+    grid = np.full((n_rows, n_cols), None, dtype=object)
+    grid[: len(cells), : len(cells.columns)] = cells.astype(object).where(cells.notna(), None).to_numpy()
+
+    for min_col, min_row, max_col, max_row in merged_ranges:
+        merged_value = grid[min_row - 1, min_col - 1]
+        grid[min_row - 1 : max_row, min_col - 1 : max_col] = None
+        grid[min_row - 1, min_col - 1] = merged_value
+        if max_col - min_col == 1:
+            grid[max_row - 1, max_col - 1] = merged_value
+
+    return pd.DataFrame(grid[1:].tolist(), columns=grid[0].tolist())
 
 
-def _get_all_daily_tables(filename: str, class_pattern: str) -> dict:
+def _get_all_daily_tables(filename: str, sheet_names: list[str] | None = None) -> dict:
     """
     Get all the daily tables from an excel file.
 
@@ -75,37 +125,283 @@ def _get_all_daily_tables(filename: str, class_pattern: str) -> dict:
     ----------
     filename : str
         The filename of the excel file to get the daily tables from.
-    class_pattern : str
-        The class to get the daily tables or. E.g. 'EL 3'
+    sheet_names : list of str, optional
+        Only read these sheets. By default every sheet is read.
 
     Returns
     -------
     dict
-        A dictionary of the daily tables for each class.
+        A dictionary of the labelled daily tables keyed by sheet name.
     """
-    # filename += ".xlsx"
+    sheets = read_excel(filename, sheet_name=sheet_names)
+    merged_ranges = read_merged_ranges(filename, sheet_names)
 
-    workbook = openpyxl.load_workbook(filename)
     dfs = {}
-    for sheet in workbook.sheetnames:
-        merged_cells = workbook[sheet].merged_cells.ranges
-        for mc in merged_cells.copy():
-            if mc.max_col - mc.min_col == 1:
-                merged_value = workbook[sheet].cell(mc.min_row, mc.min_col).value
-                workbook[sheet].unmerge_cells(mc.coord)
-                workbook[sheet].cell(mc.min_row, mc.min_col).value = merged_value
-                workbook[sheet].cell(mc.max_row, mc.max_col).value = merged_value
-
-        data = workbook[sheet].values
-        header = next(data)
-        df = pd.DataFrame(data, columns=header)
+    for sheet, cells in sheets.items():
+        df = _read_sheet(cells, merged_ranges.get(sheet, []))
         df = df.dropna(axis=1, how="all")
 
-        dfs[sheet] = _get_daily_table(df, class_pattern)
+        dfs[sheet] = _get_daily_table(df)
 
     return dfs
 
 
+class IndexedCell(NamedTuple):
+    """A non-empty timetable cell: which day, time slot and classroom it sits in."""
+
+    day: str
+    column: int
+    period: str
+    classroom: str
+    text: str
+
+
+class SheetIndex(NamedTuple):
+    """The class cells of one day sheet."""
+
+    columns: list
+    cells: list[IndexedCell]
+
+
+class SheetSpan(NamedTuple):
+    """Which cells of a workbook index come from one sheet, so the sheet can be reused on its own."""
+
+    sheet: str
+    sheet_hash: str
+    columns: list
+    cell_count: int
+
+
+class WorkbookIndex(NamedTuple):
+    """Every class cell of a lecture workbook, parsed once for all class patterns."""
+
+    columns: list | None
+    cells: list[IndexedCell]
+    # Cell texts factorized, so each distinct text is matched only once per query
+    text_codes: np.ndarray
+    unique_texts: pd.Series
+    # In workbook order, the cells of each sheet following those of the previous one
+    sheets: list[SheetSpan]
+
+
+_WORKBOOK_INDEX_CACHE_SIZE = 8
+_workbook_indexes: "OrderedDict[str, WorkbookIndex]" = OrderedDict()
+
+# Keyed by sheet content hash, so a draft with one edited day only re-parses that day
+_SHEET_INDEX_CACHE_SIZE = 64
+_sheet_indexes: "OrderedDict[str, SheetIndex]" = OrderedDict()
+
+
+@span("index_sheet")
+def _index_sheet(sheet: str, table: pd.DataFrame) -> SheetIndex:
+    """List the non-empty cells of a labelled day sheet, ordered by time slot and classroom."""
+    cells = []
+    for position, (period, classes) in enumerate(table.items()):
+        for classroom, value in classes.dropna().items():
+            cells.append(IndexedCell(sheet, position, period, classroom, str(value)))
+
+    return SheetIndex(table.columns.to_list(), cells)
+
+
+def _touch_sheet_indexes(sheet_hashes):
+    """Mark sheets as recently used, evicting the least recently used beyond the cache size."""
+    for sheet_hash in sheet_hashes:
+        _sheet_indexes.move_to_end(sheet_hash)
+    while len(_sheet_indexes) > _SHEET_INDEX_CACHE_SIZE:
+        _sheet_indexes.popitem(last=False)
+
+
+def _get_sheet_indexes(filename: str, sheet_hashes: dict[str, str]) -> dict[str, SheetIndex]:
+    """Index every sheet of a workbook, re-parsing only the sheets whose content is new."""
+    sheet_indexes = {
+        sheet: _sheet_indexes[sheet_hash]
+        for sheet, sheet_hash in sheet_hashes.items()
+        if sheet_hash in _sheet_indexes
+    }
+    changed_sheets = [sheet for sheet in sheet_hashes if sheet not in sheet_indexes]
+
+    if changed_sheets:
+        for sheet, table in _get_all_daily_tables(filename, changed_sheets).items():
+            sheet_indexes[sheet] = _index_sheet(sheet, table)
+            _sheet_indexes[sheet_hashes[sheet]] = sheet_indexes[sheet]
+        if len(changed_sheets) < len(sheet_hashes):
+            logger.info(f"Re-parsed {len(changed_sheets)} changed sheets of {filename}: {changed_sheets}")
+
+    _touch_sheet_indexes(sheet_hashes.values())
+    return {sheet: sheet_indexes[sheet] for sheet in sheet_hashes}
+
+
+def _remember_sheet_indexes(index: WorkbookIndex):
+    """Reuse the sheets of a workbook index loaded from its snapshot, so an edit re-parses only the edited sheets."""
+    start = 0
+    for sheet in index.sheets:
+        if sheet.sheet_hash not in _sheet_indexes:
+            cells = index.cells[start : start + sheet.cell_count]
+            _sheet_indexes[sheet.sheet_hash] = SheetIndex(sheet.columns, cells)
+        start += sheet.cell_count
+
+    _touch_sheet_indexes(sheet.sheet_hash for sheet in index.sheets)
+
+
+def build_workbook_index(filename: str) -> WorkbookIndex:
+    """
+    Parse a lecture workbook into an index of all its class cells.
+
+    Sheets whose content was indexed before (e.g. the unchanged days of an
+    edited draft) are reused, only changed sheets are parsed.
+
+    Parameters
+    ----------
+    filename : str
+        The filename of the excel file. This file contains every class with the days as the sheet names.
+
+    Returns
+    -------
+    WorkbookIndex
+        The time slot columns of the first day sheet and every non-empty cell,
+        ordered by sheet, time slot and classroom.
+    """
+    sheet_hashes = read_sheet_hashes(filename)
+
+    columns = None
+    cells = []
+    sheets = []
+    for sheet, sheet_index in _get_sheet_indexes(filename, sheet_hashes).items():
+        if columns is None and sheet.title() in DAYS:
+            columns = sheet_index.columns
+
+        cells.extend(sheet_index.cells)
+        sheets.append(SheetSpan(sheet, sheet_hashes[sheet], sheet_index.columns, len(sheet_index.cells)))
+
+    text_codes, unique_texts = pd.factorize(
+        pd.Series([cell.text for cell in cells], dtype=object)
+    )
+
+    return WorkbookIndex(columns, cells, text_codes, pd.Series(unique_texts, dtype=object), sheets)
+
+
+def _index_to_table(index: WorkbookIndex) -> pa.Table:
+    """Lay out a workbook index as an Arrow table, one row per cell."""
+    cells = index.cells
+    table = pa.table({
+        "day": pa.array([cell.day for cell in cells], pa.string()).dictionary_encode(),
+        "column": pa.array([cell.column for cell in cells], pa.int32()),
+        "period": pa.array([cell.period for cell in cells], pa.string()),
+        "classroom": pa.array([cell.classroom for cell in cells], pa.string()),
+        # The dictionary indices are the factorized text codes
+        "text": pa.DictionaryArray.from_arrays(
+            pa.array(index.text_codes, pa.int32()),
+            pa.array(index.unique_texts.tolist(), pa.string()),
+        ),
+    })
+    return table.replace_schema_metadata({
+        "columns": json.dumps(index.columns),
+        "sheets": json.dumps([list(sheet) for sheet in index.sheets]),
+    })
+
+
+def _index_from_table(table: pa.Table) -> WorkbookIndex:
+    """Rebuild a workbook index from its Arrow table."""
+    text = table.column("text").combine_chunks()
+    text_codes = text.indices.to_numpy(zero_copy_only=False).astype(np.intp)
+    unique_texts = text.dictionary.to_pylist()
+
+    cells = list(map(
+        IndexedCell,
+        table.column("day").to_pylist(),
+        table.column("column").to_pylist(),
+        table.column("period").to_pylist(),
+        table.column("classroom").to_pylist(),
+        [unique_texts[code] for code in text_codes],
+    ))
+    columns = json.loads(table.schema.metadata[b"columns"])
+    sheets = [SheetSpan(*sheet) for sheet in json.loads(table.schema.metadata[b"sheets"])]
+
+    return WorkbookIndex(columns, cells, text_codes, pd.Series(unique_texts, dtype=object), sheets)
+
+
+def _load_workbook_index(filename: str, content_hash: str) -> WorkbookIndex:
+    """Load a workbook index from its on-disk snapshot, parsing the file only if there is none."""
+    table = read_snapshot(filename, content_hash, "lectures")
+    if table is not None:
+        logger.info(f"Loaded lecture snapshot for {filename}")
+        inc("easechaos_snapshot_loads_total", kind="lectures")
+        with span("load_snapshot"):
+            index = _index_from_table(table)
+            _remember_sheet_indexes(index)
+            return index
+
+    inc("easechaos_draft_parses_total", draft=os.path.basename(filename).removesuffix(".xlsx"), kind="lectures")
+    with span("parse_draft"):
+        index = build_workbook_index(filename)
+    write_snapshot(filename, content_hash, "lectures", lambda: _index_to_table(index))
+    return index
+
+
+def get_workbook_index(filename: str) -> WorkbookIndex:
+    """
+    Get the index of a lecture workbook, parsing it only once per file content.
+
+    Indexes are kept in memory and snapshotted to disk, so a fresh process
+    memory-maps the snapshot instead of parsing the workbook again. Snapshots
+    record each sheet's content hash, so once the draft is edited that process
+    too only parses the edited sheets.
+
+    Parameters
+    ----------
+    filename : str
+        The filename of the excel file.
+
+    Returns
+    -------
+    WorkbookIndex
+        The cached index for the current content of the file.
+    """
+    content_hash = get_file_hash(filename)
+
+    index = _workbook_indexes.get(content_hash)
+    if index is None:
+        index = _load_workbook_index(filename, content_hash)
+        _workbook_indexes[content_hash] = index
+        if len(_workbook_indexes) > _WORKBOOK_INDEX_CACHE_SIZE:
+            _workbook_indexes.popitem(last=False)
+    else:
+        _workbook_indexes.move_to_end(content_hash)
+
+    return index
+
+
+def _match_class_slots(index: WorkbookIndex, class_pattern: str) -> Iterator[tuple[str, str, str]]:
+    """
+    Find the time slots of a class in a workbook index.
+
+    Each distinct cell text is matched once, then the matching cells are
+    grouped by day sheet and time slot.
+
+    Parameters
+    ----------
+    index : WorkbookIndex
+        The index of the workbook.
+    class_pattern : str
+        The class to find. E.g. 'EL 3'
+
+    Yields
+    ------
+    tuple of (str, str, str)
+        The day, the time slot and its classes, one "class (classroom)" per line,
+        in sheet and time slot order.
+    """
+    matcher = _get_class_matcher(class_pattern)
+    matched_texts = index.unique_texts.str.contains(matcher).to_numpy(dtype=bool)
+    matched_cells = (index.cells[i] for i in np.flatnonzero(matched_texts[index.text_codes]))
+
+    for (day, _, period), cells in groupby(
+        matched_cells, key=lambda cell: (cell.day, cell.column, cell.period)
+    ):
+        available_classes = [(re.sub(r"\s+", " ", cell.text.strip()), cell.classroom) for cell in cells]
+        yield day, period, "\n".join(f"{c} ({classroom})" for c, classroom in available_classes)
+
+
 def get_time_table(filename: str, class_pattern: str) -> pd.DataFrame:
     """
     Get the complete time table for a particular class for all days.
@@ -122,115 +418,291 @@ def get_time_table(filename: str, class_pattern: str) -> pd.DataFrame:
     pandas.DataFrame
         The complete time table for the given class.
     """
-    daily_tables = _get_all_daily_tables(filename, class_pattern)
+    index = get_workbook_index(filename)
 
-    days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
-    for key, value in daily_tables.items():
-        if key.title() in days:
-            columns = value.columns
-            break
-    else:
-        raise ValueError(f"No sheet found for any of the days: {days}")
+    if index.columns is None:
+        raise ValueError(f"No sheet found for any of the days: {DAYS}")
 
-    final_df = pd.DataFrame(
-        columns=columns,
-        index=["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"],
-    )
+    final_df = pd.DataFrame(columns=index.columns, index=DAYS)
 
-    for day, table in daily_tables.items():
-        for period, classes in table.items():
-            available_classes = classes.dropna()
-            if available_classes.any():
-                classrooms = classes[classes.notna()].index
-                available_classes = [
-                    re.sub(r"\s+", " ", c.strip()) for c in available_classes.values
-                ]
-                available_classes = [
-                    f"{c} ({classrooms[i]})" for i, c in enumerate(available_classes)
-                ]
-                available_classes = "\n".join(available_classes)
-                final_df.loc[day, period] = available_classes
+    for day, period, value in _match_class_slots(index, class_pattern):
+        final_df.loc[day, period] = value
 
     return final_df
 
 
-def convert_to_24hour(time_str, is_end_time=False):
-    """Convert time to 24-hour format considering class schedule rules."""
-    hours, minutes = map(int, time_str.split(':'))
+@dataclass(slots=True)
+class LectureSlot:
+    """A run of consecutive time slots holding the same classes, in 24-hour time."""
+
+    start: str
+    end: str
+    value: str | None
 
-    # For start times: hours <= 11 are AM, hours >= 12 are PM
-    # For end times: all times are PM
-    if is_end_time or hours <= 7:
-        if hours != 12:
-            hours += 12
+    def as_dict(self) -> dict:
+        return {"start": self.start, "end": self.end, "value": self.value}
 
-    return f"{hours:02d}:{minutes:02d}"
 
+@dataclass(slots=True)
+class DaySlots:
+    """The merged lecture slots of one weekday."""
 
-def generate_calendar(timetable, start_date, end_date):
+    day: str
+    data: list[LectureSlot]
+
+    def as_dict(self) -> dict:
+        return {"day": self.day, "data": [slot.as_dict() for slot in self.data]}
+
+
+class TimeColumn(NamedTuple):
+    """A time slot column with its parsed 24-hour start and end."""
+
+    position: int
+    start: str
+    end: str
+
+
+def lectures_convert_to_24hour(time_str: str, previous_was_pm: bool = False) -> str:
+    """
+    Convert lecture time to 24-hour format based on class schedule rules.
+
+    Lecture timetables don't use AM/PM markers, so we infer based on context:
+    - 7:00-11:59 are morning (no conversion needed)
+    - 12:00 is noon (no conversion needed)
+    - 1:00-6:59 are afternoon (add 12 hours)
+    - If previous slot was PM, current slot might be morning continuation
+
+    Parameters
+    ----------
+    time_str : str
+        Time string in format "HH:MM".
+    previous_was_pm : bool
+        Whether the previous time slot was in PM.
+
+    Returns
+    -------
+    str
+        Time string in 24-hour format "HH:MM".
     """
-    Generate a calendar of class events based on a given timetable within a specified date range.
+    if not time_str or not time_str.strip():
+        raise ValueError("Time string cannot be empty")
+
+    hours, minutes = map(int, time_str.strip().split(":"))
+
+    if not previous_was_pm:
+        # Morning hours (7:00-11:59) stay the same
+        if 7 <= hours <= 11:
+            return f"{hours}:{minutes:02d}"
+        # Noon stays the same
+        elif hours == 12:
+            return f"12:{minutes:02d}"
+        # Afternoon hours (1:00-6:59) convert to PM
+        else:
+            return f"{hours + 12}:{minutes:02d}"
+    else:
+        # If previous was PM, this might be a morning continuation
+        if hours == 12:
+            return f"12:{minutes:02d}"
+        elif hours <= 7:
+            return f"{hours + 12}:{minutes:02d}"
+        return f"{hours}:{minutes:02d}"
+
+
+@lru_cache(maxsize=32)
+def _get_time_columns(columns: tuple) -> tuple[TimeColumn, ...]:
+    """
+    Parse time slot headers such as "8:00-9:00" into 24-hour times, once per sheet layout.
+
+    Headers that are not time ranges are left out.
+    """
+    time_columns = []
+    previous_was_pm = False
+    for position, key in enumerate(columns):
+        if not key or not isinstance(key, str):
+            continue
+
+        time_parts = key.split("-")
+        if len(time_parts) < 2:
+            continue
+
+        start = time_parts[0].strip()
+        end = time_parts[-1].strip()
+        if not start or not end:
+            continue
+
+        try:
+            start_24h = lectures_convert_to_24hour(start)
+            end_24h = lectures_convert_to_24hour(end, previous_was_pm)
+        except ValueError as e:
+            logger.error(f"Error processing lecture time slot {key}: {e}")
+            continue
+
+        time_columns.append(TimeColumn(position, start_24h, end_24h))
+        previous_was_pm = int(start_24h.split(":")[0]) >= 12
+
+    return tuple(time_columns)
+
+
+@span("lecture_slots")
+def get_lecture_slots(filename: str, class_pattern: str) -> list[DaySlots]:
+    """
+    Get the weekly lecture slots of a class straight from the workbook index.
+
+    Equivalent to shaping the records of get_time_table, without building the
+    DataFrame: consecutive slots with the same classes (or none) are merged.
+
+    Parameters
+    ----------
+    filename : str
+        The filename of the excel file. This file contains every class with the days as the sheet names.
+    class_pattern : str
+        The class to get the lecture slots for. E.g. 'EL 3'
+
+    Returns
+    -------
+    list of DaySlots
+        One entry per weekday, Monday to Friday.
+    """
+    index = get_workbook_index(filename)
+
+    if index.columns is None:
+        raise ValueError(f"No sheet found for any of the days: {DAYS}")
+
+    columns = list(index.columns)
+    if len(set(columns)) != len(columns):
+        raise ValueError(f"Time slot columns must be unique: {columns}")
+    positions = {column: position for position, column in enumerate(columns)}
+    values: dict[str, dict[int, str]] = {day: {} for day in DAYS}
+
+    for day, period, value in _match_class_slots(index, class_pattern):
+        if day not in values:
+            raise IndexError(f"Sheet {day} is not one of the days: {DAYS}")
+        if period not in positions:
+            # A slot only some other day sheet has goes after the known ones
+            positions[period] = len(columns)
+            columns.append(period)
+
+        values[day][positions[period]] = value
+
+    time_columns = _get_time_columns(tuple(columns))
+
+    week = []
+    for day in DAYS:
+        day_values = values[day]
+        slots = []
+        current = None
+        for column in time_columns:
+            value = day_values.get(column.position)
+            if current is not None and current.value == value and current.end == column.start:
+                current.end = column.end
+            else:
+                current = LectureSlot(column.start, column.end, value)
+                slots.append(current)
+        week.append(DaySlots(day, slots))
+
+    return week
+
+
+def is_lecture_workbook(filename: str) -> bool:
+    """Check whether a workbook has any day sheets, without reading its cells."""
+    return any(sheet.title() in DAYS for sheet in read_sheet_names(filename))
+
+
+def get_class_mentions(filename: str) -> set[ClassMention]:
+    """
+    Find every class, section and course code mentioned in a lecture workbook.
+
+    Parameters
+    ----------
+    filename : str
+        The filename of the excel file.
+
+    Returns
+    -------
+    set of ClassMention
+        The mentions of all cells, each with its class pattern.
+    """
+    mentions = set()
+    for text in get_workbook_index(filename).unique_texts:
+        mentions |= parse_class_mentions(text)
+
+    return mentions
+
+
+def get_class_patterns(filename: str) -> list[str]:
+    """
+    List every class pattern mentioned in a lecture workbook.
+
+    Parameters
+    ----------
+    filename : str
+        The filename of the excel file.
+
+    Returns
+    -------
+    list of str
+        Sorted class patterns such as 'CE 4', one per department and year.
+    """
+    return sorted({mention.class_pattern for mention in get_class_mentions(filename)})
+
+
+def generate_calendar(timetable, start_date: date, end_date: date) -> bytes:
+    """
+    Generate a calendar of weekly class events based on a given timetable within a specified date range.
+
+    Every slot with a class becomes one event repeating weekly from its first
+    day in the range until the end date, so the work grows with the number of
+    slots rather than with the number of days. The output only depends on the
+    arguments: UIDs are derived from the slots and DTSTAMP is the start date.
 
     Parameters:
-        timetable (list): A list of dictionaries representing the timetable data. Each dictionary contains the following keys:
+        timetable (list): The endpoint's lecture timetable. Each entry contains the following keys:
             - day (str): The name of the day.
-            - data (list): A list of dictionaries representing the class events for the day. Each dictionary contains the following keys:
-                - start (str): The start time of the class in the format 'HH:MM'.
-                - end (str): The end time of the class in the format 'HH:MM'.
-                - value (str): The name of the class.
+            - data (list): The day's slots, each a dictionary with the following keys:
+                - start (str): The start time of the slot in the format 'HH:MM' (24-hour).
+                - end (str): The end time of the slot in the format 'HH:MM' (24-hour).
+                - value (str | None): The classes in the slot, or None if there are none.
 
-        start_date (str): The start date of the calendar in the format 'YYYY-MM-DD'.
-        end_date (str): The end date of the calendar in the format 'YYYY-MM-DD'.
+        start_date (date): The first day of the calendar.
+        end_date (date): The last day of the calendar.
 
     Returns:
-        bytes
-
-    This function generates a calendar of class events based on the provided timetable within the specified date range.
-    It iterates over the timetable data, checks if the day matches the current date, and adds class events to the calendar.
-    The resulting calendar is saved as an ICS file named 'class_schedule.ics'.
+        bytes: The calendar in iCalendar format
     """
-    data = timetable
-
     cal = Calendar()
-    cal.add('version', '2.0')
-    cal.add('prodid', '-//Class Schedule Generator//EN')
-
-    start_date = datetime.strptime(start_date, "%Y-%m-%d")
-    end_date = datetime.strptime(end_date, "%Y-%m-%d")
-
-
-    current_date = start_date
-    while current_date <= end_date:
-        day_name = current_date.strftime("%A")
-        for day in data:
-            if day["day"] == day_name:
-                for class_info in day["data"]:
-                    if class_info["value"]:
-                        event = Event()
-
-                        start_time_24h = convert_to_24hour(class_info["start"])
-                        end_time_24h = convert_to_24hour(class_info["end"], is_end_time=True)
-
-                        start_time = datetime.strptime(start_time_24h, "%H:%M")
-                        end_time = datetime.strptime(end_time_24h, "%H:%M")
-
-                        event_start = current_date.replace(
-                            hour=start_time.hour,
-                            minute=start_time.minute
-                        )
-                        event_end = current_date.replace(
-                            hour=end_time.hour,
-                            minute=end_time.minute
-                        )
-
-                        event.add("summary", class_info["value"].replace("\n", " "))
-                        event.add("dtstart", event_start)
-                        event.add("dtend", event_end)
-                        event.add('dtstamp', datetime.now())
-
-                        cal.add_component(event)
-        current_date += timedelta(days=1)
-
-    with open("class_schedule.ics", "wb") as f:
-        f.write(cal.to_ical())
+    cal.add("version", "2.0")
+    cal.add("prodid", "-//Class Schedule Generator//EN")
+
+    stamp = datetime.combine(start_date, time(), tzinfo=timezone.utc)
+    until = datetime.combine(end_date, time(23, 59, 59))
+
+    for day in timetable:
+        if day["day"] not in DAYS:
+            continue
+
+        # The first date in the range falling on this weekday
+        first_date = start_date + timedelta(days=(DAYS.index(day["day"]) - start_date.weekday()) % 7)
+        if first_date > end_date:
+            continue
+
+        for class_info in day["data"]:
+            if not class_info["value"]:
+                continue
+
+            start_time = datetime.strptime(class_info["start"], "%H:%M").time()
+            end_time = datetime.strptime(class_info["end"], "%H:%M").time()
+            uid = hashlib.md5(
+                f"{day['day']}|{class_info['start']}|{class_info['end']}|{class_info['value']}".encode()
+            ).hexdigest()
+
+            event = Event()
+            event.add("uid", f"{uid}@easechaos")
+            event.add("summary", class_info["value"].replace("\n", " "))
+            event.add("dtstart", datetime.combine(first_date, start_time))
+            event.add("dtend", datetime.combine(first_date, end_time))
+            event.add("dtstamp", stamp)
+            event.add("rrule", {"freq": "weekly", "until": until})
+
+            cal.add_component(event)
+
     return cal.to_ical()
@@ -0,0 +1,137 @@
+import hashlib
+import logging
+import posixpath
+import re
+import zipfile
+from xml.etree import ElementTree
+
+import pandas as pd
+from openpyxl.utils.cell import range_boundaries
+
+from api.config.redis_config import settings
+from api.services.metrics import span
+
+logger = logging.getLogger(__name__)
+
+ENGINES = ("calamine", "openpyxl")
+
+_MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_PACKAGE_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+# Merged ranges are listed at the end of the sheet XML as <mergeCell ref="A1:B2"/>
+_MERGE_CELL_PATTERN = re.compile(rb'<(?:\w+:)?mergeCell\s+ref="([A-Z]+[0-9]+:[A-Z]+[0-9]+)"')
+# A cell holding a shared string stores its index into xl/sharedStrings.xml
+_SHARED_STRING_CELL_PATTERN = re.compile(rb't="s"[^>]*>\s*<(?:\w+:)?v>(\d+)(?=</)')
+_SHARED_STRING_PATTERN = re.compile(rb'<(?:\w+:)?si\b[^>]*?(?:/>|>(.*?)</(?:\w+:)?si>)', re.DOTALL)
+
+
+@span("read_workbook")
+def read_excel(filename, sheet_name=0, engine: str | None = None):
+    """
+    Read raw cell values from an Excel file, without a header row.
+
+    The engine defaults to the SPREADSHEET_ENGINE setting. If it is not
+    installed or fails to read the file, openpyxl is used instead.
+
+    Args:
+        filename: Path to the Excel file
+        sheet_name: Sheet index or name, or None for every sheet
+        engine: "calamine" or "openpyxl"
+
+    Returns:
+        A DataFrame, or a dict of DataFrames keyed by sheet name if sheet_name is None
+    """
+    engine = engine or settings.SPREADSHEET_ENGINE
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown spreadsheet engine: {engine}")
+
+    if engine != "openpyxl":
+        try:
+            return pd.read_excel(filename, sheet_name=sheet_name, header=None, engine=engine)
+        except ImportError as e:
+            logger.warning(f"Spreadsheet engine {engine} unavailable, using openpyxl: {e}")
+        except (FileNotFoundError, ValueError):
+            raise
+        except Exception as e:
+            logger.warning(f"Spreadsheet engine {engine} failed on {filename}, using openpyxl: {e}")
+
+    return pd.read_excel(filename, sheet_name=sheet_name, header=None, engine="openpyxl")
+
+
+def _get_sheet_paths(archive: zipfile.ZipFile) -> dict[str, str]:
+    """Map each sheet name to its XML file inside the archive, in workbook order."""
+    workbook = ElementTree.fromstring(archive.read("xl/workbook.xml"))
+    rels = ElementTree.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+    targets = {rel.get("Id"): rel.get("Target") for rel in rels.iter(f"{_PACKAGE_REL_NS}Relationship")}
+
+    sheet_paths = {}
+    for sheet in workbook.iter(f"{_MAIN_NS}sheet"):
+        target = targets[sheet.get(f"{_REL_NS}id")]
+        if target.startswith("/"):
+            sheet_paths[sheet.get("name")] = target.lstrip("/")
+        else:
+            sheet_paths[sheet.get("name")] = posixpath.normpath(posixpath.join("xl", target))
+
+    return sheet_paths
+
+
+def read_sheet_names(filename) -> list[str]:
+    """List the sheet names of an Excel file in workbook order, without reading any cells."""
+    with zipfile.ZipFile(filename) as archive:
+        return list(_get_sheet_paths(archive))
+
+
+def read_merged_ranges(filename, sheet_names: list[str] | None = None) -> dict[str, list[tuple[int, int, int, int]]]:
+    """
+    Read the merged ranges of every sheet straight from the xlsx archive.
+
+    Args:
+        filename: Path to the Excel file
+        sheet_names: Only read these sheets, or None for every sheet
+
+    Returns:
+        Merged ranges as (min_col, min_row, max_col, max_row), keyed by sheet name
+    """
+    with zipfile.ZipFile(filename) as archive:
+        return {
+            sheet: [range_boundaries(ref.decode()) for ref in _MERGE_CELL_PATTERN.findall(archive.read(path))]
+            for sheet, path in _get_sheet_paths(archive).items()
+            if sheet_names is None or sheet in sheet_names
+        }
+
+
+@span("sheet_hashes")
+def read_sheet_hashes(filename) -> dict[str, str]:
+    """
+    Hash the content of every sheet separately, without parsing the cells.
+
+    Shared string indices are replaced by the strings themselves, so a sheet's
+    hash only changes when that sheet does, even if the shared string table of
+    the workbook is renumbered.
+
+    Args:
+        filename: Path to the Excel file
+
+    Returns:
+        Hex digest of each sheet's name and content, keyed by sheet name in workbook order
+    """
+    with zipfile.ZipFile(filename) as archive:
+        try:
+            shared_strings = [
+                match[1] or b"" for match in _SHARED_STRING_PATTERN.finditer(archive.read("xl/sharedStrings.xml"))
+            ]
+        except KeyError:
+            shared_strings = []
+
+        sheet_hashes = {}
+        for sheet, path in _get_sheet_paths(archive).items():
+            # Split into [xml, string index, xml, ...] and swap each index for its string
+            parts = _SHARED_STRING_CELL_PATTERN.split(archive.read(path))
+            parts[1::2] = [shared_strings[int(index)] for index in parts[1::2]]
+
+            digest = hashlib.md5(sheet.encode())
+            digest.update(b"".join(parts))
+            sheet_hashes[sheet] = digest.hexdigest()
+
+    return sheet_hashes
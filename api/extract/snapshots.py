@@ -0,0 +1,109 @@
+import logging
+import os
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable
+
+import pyarrow as pa
+
+from api.config.redis_config import SNAPSHOTS_FOLDER
+from api.services.fingerprint import get_file_hash
+from api.services.metrics import span
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the parsed form of a draft changes, so old snapshots are ignored
+SNAPSHOT_VERSION = 3
+
+# Set by ignoring_snapshots, a worker runs one job at a time
+_ignoring_snapshots = False
+
+
+def get_snapshot_path(filename: str, content_hash: str, kind: str) -> Path:
+    """Snapshots are kept in one folder per draft, so a draft's superseded versions can be found and removed."""
+    return SNAPSHOTS_FOLDER / Path(filename).stem / f"{content_hash}-{kind}-v{SNAPSHOT_VERSION}.arrow"
+
+
+def _is_current_version(filename: str, content_hash: str) -> bool:
+    """Check a version against the draft's content now, a memoized stat unless the draft changed."""
+    try:
+        return get_file_hash(filename) == content_hash
+    except OSError:
+        return False
+
+
+@contextmanager
+def ignoring_snapshots():
+    """Read no snapshots within the block, so drafts are parsed from their Excel files (snapshots are still written)."""
+    global _ignoring_snapshots
+    previous, _ignoring_snapshots = _ignoring_snapshots, True
+    try:
+        yield
+    finally:
+        _ignoring_snapshots = previous
+
+
+def read_snapshot(filename: str, content_hash: str, kind: str) -> pa.Table | None:
+    """
+    Memory-map the parsed snapshot of a draft, if one was written before.
+
+    Args:
+        filename: Path of the draft
+        content_hash: Content hash of the draft
+        kind: What was parsed, e.g. "lectures" or "exams"
+
+    Returns:
+        The snapshot table, or None if there is no readable snapshot
+    """
+    path = get_snapshot_path(filename, content_hash, kind)
+    if _ignoring_snapshots or not path.exists():
+        return None
+
+    try:
+        # The table's buffers keep the memory map open for as long as they are used
+        return pa.ipc.open_file(pa.memory_map(str(path))).read_all()
+    except (OSError, pa.ArrowException) as e:
+        logger.warning(f"Ignoring unreadable snapshot {path}: {e}")
+        return None
+
+
+@span("write_snapshot")
+def write_snapshot(filename: str, content_hash: str, kind: str, to_table: Callable[[], pa.Table]):
+    """
+    Persist the parsed form of a draft so later processes can skip parsing it.
+
+    The draft's snapshots of other versions are removed, so only its current
+    version is kept on disk. A draft that changed while it was parsed is not
+    snapshotted, which keeps a late write from removing the newer snapshot.
+    Failures are logged and otherwise ignored: a snapshot is only a shortcut.
+
+    Args:
+        filename: Path of the draft
+        content_hash: Content hash of the draft
+        kind: What was parsed, e.g. "lectures" or "exams"
+        to_table: Builds the Arrow table to store
+    """
+    path = get_snapshot_path(filename, content_hash, kind)
+    if not _is_current_version(filename, content_hash):
+        logger.info(f"Not writing snapshot {path} of a superseded draft version")
+        return
+
+    # Write then rename, so concurrent workers never read a partial file
+    tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        table = to_table()
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        with pa.OSFile(str(tmp_path), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+
+        # Workers still reading a removed snapshot keep their memory map of it
+        for superseded in path.parent.glob(f"*-{kind}-v*.arrow"):
+            if superseded != path:
+                superseded.unlink(missing_ok=True)
+    except (OSError, TypeError, ValueError, pa.ArrowException) as e:
+        logger.warning(f"Could not write snapshot {path}: {e}")
+        tmp_path.unlink(missing_ok=True)
@@ -0,0 +1,236 @@
+import gzip
+import json
+import logging
+import os
+import re
+from datetime import date, datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import APIRouter, Header, HTTPException, Response
+
+from api.config.redis_config import DRAFTS_FOLDER, add_tables_to_cache, get_table_from_cache
+from api.extract.extract_exam_table import generate_exam_calendar
+from api.extract.extract_lectures_table import generate_calendar
+from api.routes.timetable import TimeTableRequest, etag_matches, get_timetable_payload, make_etag
+from api.services.fingerprint import get_file_hash
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+def calendar_cache_pattern(class_pattern: str, is_exam: bool, start: date | None, end: date | None) -> str:
+    """Identify a class's calendar in the timetable cache; lecture calendars also by date range."""
+    if is_exam:
+        return f"{class_pattern}.ics"
+    return f"{class_pattern}@{start}..{end}.ics"
+
+
+def accepts_gzip(accept_encoding: str | None) -> bool:
+    """Check whether the client takes gzip, ignoring codings it refuses with q=0."""
+    for coding in (accept_encoding or "").lower().split(","):
+        name, _, params = coding.partition(";")
+        if name.strip() in ("gzip", "*"):
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+def not_modified_since(if_modified_since: str | None, last_modified: datetime) -> bool:
+    """Check an If-Modified-Since header against the draft's modification time, to the second."""
+    if not if_modified_since:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified.replace(microsecond=0) <= since
+
+
+async def get_calendar_body(
+    base_filename: str,
+    version: str,
+    class_pattern: str,
+    is_exam: bool,
+    start: date | None,
+    end: date | None,
+    compressed: bool,
+) -> bytes:
+    """
+    Get a class's calendar, building it from its timetable on a cache miss.
+
+    The calendar is cached as-is and gzip-compressed, so either encoding is
+    later served without building or compressing it again.
+
+    Returns:
+        The iCalendar bytes, gzip-compressed if requested
+    """
+    cache_pattern = calendar_cache_pattern(class_pattern, is_exam, start, end)
+    gzip_pattern = f"{cache_pattern}.gz"
+
+    body = await get_table_from_cache(
+        base_filename, gzip_pattern if compressed else cache_pattern, is_exam, version
+    )
+    if body is not None:
+        return body
+
+    payload = await get_timetable_payload(
+        TimeTableRequest(filename=base_filename, class_pattern=class_pattern, is_exam=is_exam), version
+    )
+    table_data = json.loads(payload)["data"]
+    ics = generate_exam_calendar(table_data) if is_exam else generate_calendar(table_data, start, end)
+    # mtime=0 keeps the compressed bytes identical across builds and workers
+    ics_gzip = gzip.compress(ics, mtime=0)
+
+    await add_tables_to_cache(
+        base_filename, version, {(cache_pattern, is_exam): ics, (gzip_pattern, is_exam): ics_gzip}
+    )
+    return ics_gzip if compressed else ics
+
+
+async def get_calendar_response(
+    draft: str,
+    class_pattern: str,
+    is_exam: bool,
+    start: date | None,
+    end: date | None,
+    if_none_match: str | None,
+    if_modified_since: str | None,
+    accept_encoding: str | None,
+    headers: dict[str, str] | None = None,
+) -> Response:
+    """
+    Build a calendar response, answering 304 when the client's copy is current.
+
+    The ETag comes from the draft's content hash and Last-Modified from its
+    modification time, so a poll of an unchanged draft is answered from a
+    memoized stat without any cache lookup or extraction.
+
+    Raises:
+        HTTPException: 400 if a lecture calendar has no valid date range,
+            404 if the draft or class doesn't exist, 503 if the extraction queue is full
+    """
+    if not is_exam:
+        if start is None or end is None:
+            raise HTTPException(status_code=400, detail="start and end are required for lecture calendars")
+        if end < start:
+            raise HTTPException(status_code=400, detail="end must not be before start")
+
+    base_filename = draft.replace(".xlsx", "")
+    full_path = os.path.join(DRAFTS_FOLDER, f"{base_filename}.xlsx")
+    try:
+        version = get_file_hash(full_path)
+        last_modified = datetime.fromtimestamp(os.stat(full_path).st_mtime, tz=timezone.utc)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Timetable file not found: {full_path}")
+
+    compressed = accepts_gzip(accept_encoding)
+    etag = make_etag(version, calendar_cache_pattern(class_pattern, is_exam, start, end), is_exam)
+    if compressed:
+        # Each encoding is a different representation and needs its own strong ETag
+        etag = f'{etag[:-1]}-gzip"'
+
+    headers = {
+        **(headers or {}),
+        "ETag": etag,
+        "Last-Modified": format_datetime(last_modified, usegmt=True),
+        "Cache-Control": "public, no-cache",
+        "Vary": "Accept-Encoding",
+    }
+
+    # If-Modified-Since only counts without If-None-Match (RFC 9110, 13.2.2)
+    if etag_matches(if_none_match, etag) or (
+        if_none_match is None and not_modified_since(if_modified_since, last_modified)
+    ):
+        return Response(status_code=304, headers=headers)
+
+    body = await get_calendar_body(base_filename, version, class_pattern, is_exam, start, end, compressed)
+    if compressed:
+        headers["Content-Encoding"] = "gzip"
+
+    return Response(content=body, media_type="text/calendar", headers=headers)
+
+
+@router.get("/ics")
+async def get_calendar_endpoint(
+    filename: str,
+    class_pattern: str,
+    is_exam: bool = False,
+    start: date | None = None,
+    end: date | None = None,
+    if_none_match: str | None = Header(default=None),
+    if_modified_since: str | None = Header(default=None),
+    accept_encoding: str | None = Header(default=None),
+):
+    """
+    Download a class's timetable as an iCalendar file.
+
+    Each lecture slot becomes one event repeating weekly from start to end;
+    each exam becomes one event. The calendar is built from the same (cached)
+    timetable as get_time_table, cached per draft version, class and date
+    range, and never written to disk.
+
+    Args:
+        filename: Draft filename, with or without .xlsx
+        class_pattern: Class to export, e.g. "CE 4"
+        is_exam: Export the exam timetable instead of lectures
+        start: First day of the semester, as YYYY-MM-DD (lectures only)
+        end: Last day of the semester, as YYYY-MM-DD (lectures only)
+
+    Returns:
+        The calendar as text/calendar, or an empty 304 response
+
+    Raises:
+        HTTPException: 400 if a lecture calendar has no valid date range,
+            404 if the draft or class doesn't exist, 503 if the extraction queue is full
+    """
+    download_name = re.sub(r"[^A-Za-z0-9]+", "-", class_pattern).strip("-") or "timetable"
+    return await get_calendar_response(
+        filename,
+        class_pattern,
+        is_exam,
+        start,
+        end,
+        if_none_match,
+        if_modified_since,
+        accept_encoding,
+        headers={"Content-Disposition": f'attachment; filename="{download_name}.ics"'},
+    )
+
+
+@router.get("/feeds/{draft}/{class_pattern}.ics")
+async def get_calendar_feed(
+    draft: str,
+    class_pattern: str,
+    is_exam: bool = False,
+    start: date | None = None,
+    end: date | None = None,
+    if_none_match: str | None = Header(default=None),
+    if_modified_since: str | None = Header(default=None),
+    accept_encoding: str | None = Header(default=None),
+):
+    """
+    Subscribable calendar feed of one class, e.g. /feeds/Draft_1/CE%204.ics?start=...&end=...
+
+    The URL stays the same across draft versions, so calendar apps keep polling
+    it and pick up new drafts. Polls of an unchanged draft get a 304 from the
+    ETag or Last-Modified alone; changed drafts are served precompressed.
+
+    Args:
+        draft: Draft filename, with or without .xlsx
+        class_pattern: Class to subscribe to, e.g. "CE 4"
+        is_exam: Subscribe to the exam timetable instead of lectures
+        start: First day of the semester, as YYYY-MM-DD (lectures only)
+        end: Last day of the semester, as YYYY-MM-DD (lectures only)
+
+    Returns:
+        The calendar as text/calendar, or an empty 304 response
+
+    Raises:
+        HTTPException: 400 if a lecture feed has no valid date range,
+            404 if the draft or class doesn't exist, 503 if the extraction queue is full
+    """
+    return await get_calendar_response(
+        draft, class_pattern, is_exam, start, end, if_none_match, if_modified_since, accept_encoding
+    )
@@ -0,0 +1,61 @@
+import logging
+import os
+
+from fastapi import APIRouter, HTTPException, Query
+
+from api.config.redis_config import DRAFTS_FOLDER, settings
+from api.services.catalogue import get_class_catalogue
+from api.services.extraction import ExtractionQueueFull
+from api.services.fingerprint import get_file_hash
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+@router.get("/classes")
+async def get_classes_endpoint(
+    draft: str,
+    prefix: str = "",
+    limit: int = Query(default=20, ge=1, le=200),
+):
+    """
+    Autocomplete classes, sections and course codes of a draft.
+
+    The catalogue of a draft version is built once in the extraction pool and
+    then searched in memory, ignoring case and spacing.
+
+    Args:
+        draft: Draft filename, with or without .xlsx
+        prefix: Start of the class, e.g. "ce 4"
+        limit: Maximum number of entries returned
+
+    Returns:
+        The draft version and the matching entries, each with its kind
+        ("class", "section" or "course") and the class_pattern to request
+
+    Raises:
+        HTTPException: 404 if the draft doesn't exist, 503 if the extraction queue is full
+    """
+    base_filename = draft.replace(".xlsx", "")
+    full_path = os.path.join(DRAFTS_FOLDER, f"{base_filename}.xlsx")
+    try:
+        version = get_file_hash(full_path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Timetable file not found: {full_path}")
+
+    try:
+        catalogue = await get_class_catalogue(base_filename, full_path, version)
+    except ExtractionQueueFull as e:
+        logger.warning(f"Rejecting class catalogue request: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail="Timetable extraction is busy, please retry shortly",
+            headers={"Retry-After": str(settings.EXTRACTION_RETRY_AFTER)},
+        )
+
+    return {
+        "draft": base_filename,
+        "version": version,
+        "classes": [mention._asdict() for mention in catalogue.search(prefix, limit)],
+    }
@@ -1,21 +1,50 @@
+import asyncio
+import hashlib
+import hmac
 import os
 import logging
-from fastapi import APIRouter
-from pydantic import BaseModel
-from api.extract.extract_lectures_table import get_time_table
-from api.extract.extract_exam_table import get_exam_timetable
-import json
+from datetime import date, datetime
 from pathlib import Path
-import hashlib
+from typing import Literal
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+from api.extract.extract_lectures_table import (
+    get_class_patterns,
+    get_lecture_slots,
+    is_lecture_workbook,
+)
+from api.extract.extract_exam_table import (
+    get_exam_class_patterns,
+    get_exam_slots,
+    load_exam_timetable,
+    filter_exam_timetable,
+    shape_exam_slots,
+)
+import json
 
 from api.config.redis_config import (
+    DRAFTS_FOLDER,
+    settings,
+    create_cache_key_from_parameters,
     get_table_from_cache,
+    get_tables_from_cache,
     add_table_to_cache,
+    add_tables_to_cache,
+    acquire_lock,
+    is_locked,
+    release_lock,
 )
+from api.services.catalogue import get_loaded_catalogue
+from api.services.extraction import ExtractionQueueFull, run_extraction
+from api.services.fingerprint import get_file_hash
+from api.services.metrics import span
+from api.services.profiling import profile_cold_call
+from api.services.singleflight import single_flight
 
-current_script_path = Path(__file__)
-project_root_path = current_script_path.parents[1]
-DRAFTS_FOLDER = project_root_path / "drafts"
+LOCK_POLL_INTERVAL = 0.1
+MAX_BATCH_PATTERNS = 200
+MAX_NEXT_EXAMS = 100
 
 router = APIRouter()
 
@@ -23,271 +52,567 @@ router = APIRouter()
 class TimeTableRequest(BaseModel):
     """
     Represents a request for a timetable (lecture or exam).
+
+    Exam requests can be narrowed to the exams from one day to another (both
+    inclusive) and to the first ``next`` of them. ``next`` without ``from``
+    counts from today.
     """
 
+    model_config = ConfigDict(populate_by_name=True)
+
     filename: str
     class_pattern: str
     is_exam: bool = False
+    date_from: date | None = Field(default=None, alias="from")
+    date_to: date | None = Field(default=None, alias="to")
+    next: int | None = Field(default=None, ge=1, le=MAX_NEXT_EXAMS)
+
+    @model_validator(mode="after")
+    def count_next_from_today(self) -> "TimeTableRequest":
+        if self.next is not None and self.date_from is None:
+            self.date_from = date.today()
+        return self
+
+    @property
+    def has_date_filter(self) -> bool:
+        return self.date_from is not None or self.date_to is not None or self.next is not None
+
+    @property
+    def cache_pattern(self) -> str:
+        """The class pattern, with the date filter if any, as it identifies the response in the cache."""
+        if not self.has_date_filter:
+            return self.class_pattern
+        return f"{self.class_pattern}@{self.date_from or ''}..{self.date_to or ''}#{self.next or ''}"
+
+
+class BatchTimeTableRequest(BaseModel):
+    """
+    Represents a request for the timetables of many classes in one draft.
+    """
+
+    filename: str
+    class_patterns: list[str] = Field(min_length=1, max_length=MAX_BATCH_PATTERNS)
+    timetable_types: list[Literal["lecture", "exam"]] = ["lecture"]
+
+
+async def _wait_for_cached_table(
+    request: TimeTableRequest, base_filename: str, version: str, lock_name: str
+):
+    """Wait for another worker holding the extraction lock to fill the cache."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.EXTRACTION_LOCK_TIMEOUT
+    while loop.time() < deadline:
+        await asyncio.sleep(LOCK_POLL_INTERVAL)
+        payload = await get_table_from_cache(
+            base_filename, request.cache_pattern, request.is_exam, version
+        )
+        if payload is not None or not await is_locked(lock_name):
+            return payload
+    return None
+
+
+async def _extract_and_cache(
+    request: TimeTableRequest, base_filename: str, full_path: str, version: str, lock_name: str
+) -> bytes:
+    """
+    Extract a timetable and cache it, at most once across all API workers.
+
+    If another worker already holds the extraction lock for this key and draft
+    version, its result is awaited from the cache instead of parsing again.
+    """
+    token = await acquire_lock(lock_name, settings.EXTRACTION_LOCK_TIMEOUT)
+    if token is None:
+        payload = await _wait_for_cached_table(request, base_filename, version, lock_name)
+        if payload is not None:
+            return payload
+
+    try:
+        try:
+            payload = await run_extraction(
+                build_timetable_payload,
+                full_path,
+                request.class_pattern,
+                request.is_exam,
+                version,
+                request.date_from,
+                request.date_to,
+                request.next,
+            )
+        except ExtractionQueueFull as e:
+            logger.warning(f"Rejecting timetable request: {e}")
+            raise HTTPException(
+                status_code=503,
+                detail="Timetable extraction is busy, please retry shortly",
+                headers={"Retry-After": str(settings.EXTRACTION_RETRY_AFTER)},
+            )
+
+        # Store in cache for future requests
+        await add_table_to_cache(
+            table=payload,
+            filename=base_filename,
+            class_pattern=request.cache_pattern,
+            is_exam=request.is_exam,
+            version=version,
+        )
+    finally:
+        if token is not None:
+            await release_lock(lock_name, token)
 
+    return payload
 
-def get_json_table(request: TimeTableRequest):
+
+async def get_timetable_payload(request: TimeTableRequest, version: str) -> bytes:
     """
-    Get the timetable in JSON format (either lecture or exam) with caching.
+    Get the serialized endpoint response for a timetable (lecture or exam) with caching.
 
     This function implements a caching strategy to improve performance:
-    1. Check Redis cache first using filename, class pattern, and exam flag as key
-    2. If cache miss, process Excel file and store result in cache
-    3. Return parsed JSON data for API response
+    1. Check cache first using filename, draft version, class pattern (with any date
+       filter), and exam flag as key
+    2. If cache miss, process Excel file in the extraction pool and store result in cache.
+       Concurrent misses for the same key and draft version share one extraction.
+    3. Return the ready-to-send JSON bytes
 
     Args:
         request: TimeTableRequest containing filename, class_pattern, and is_exam flag
+        version: Content hash of the draft, embedded in the response
 
     Returns:
-        Parsed JSON data from Excel file or cache
+        JSON bytes of the complete response from the Excel file or cache
 
     Raises:
         FileNotFoundError: If Excel file doesn't exist in drafts folder
+        HTTPException: 404 if the draft's class catalogue is loaded and has no such class,
+            503 with Retry-After if the extraction queue is full
     """
     # Normalize filename once here to ensure consistency
     base_filename = request.filename.replace(".xlsx", "")  # Strip any .xlsx
     filename = f"{base_filename}.xlsx"  # Add it back once
 
     # Check cache first for performance
-    table = get_table_from_cache(base_filename, request.class_pattern, request.is_exam)
+    payload = await get_table_from_cache(
+        base_filename, request.cache_pattern, request.is_exam, version
+    )
 
-    if table is None:
+    if payload is None:
         # Cache miss - process Excel file
         full_path = os.path.join(DRAFTS_FOLDER, filename)
         if not os.path.exists(full_path):
             raise FileNotFoundError(f"Timetable file not found: {full_path}")
 
-        # Process based on timetable type
-        if request.is_exam:
-            table = get_exam_timetable(full_path, request.class_pattern).to_json(
-                orient="records"
-            )
-        else:
-            table = get_time_table(full_path, request.class_pattern).to_json(
-                orient="records"
+        # Unknown classes only produce empty tables, don't extract them
+        catalogue = get_loaded_catalogue(base_filename, version)
+        if catalogue is not None and not catalogue.has_class(request.class_pattern):
+            raise HTTPException(
+                status_code=404,
+                detail=f"Class {request.class_pattern} not found in {filename}",
             )
 
-        # Store in cache for future requests
-        add_table_to_cache(table, base_filename, request.class_pattern, request.is_exam)
+        # The key embeds the draft version, so it identifies exactly one extraction
+        cache_key = create_cache_key_from_parameters(
+            base_filename, request.cache_pattern, request.is_exam, version
+        )
+        payload = await single_flight(
+            cache_key,
+            lambda: _extract_and_cache(request, base_filename, full_path, version, cache_key),
+        )
 
-    return json.loads(table)
+    return payload
 
 
 logging.basicConfig(level=logging.ERROR)
 logger = logging.getLogger(__name__)
 
 
-def lectures_convert_to_24hour(time_str: str, previous_was_pm: bool = False) -> str:
+@span("serialize")
+def _serialize_payload(table_data: list, version: str) -> bytes:
+    """Serialize shaped exam dicts or lecture slot records (via their ``as_dict``)."""
+    return json.dumps(
+        {"data": table_data, "version": version},
+        ensure_ascii=False,
+        separators=(",", ":"),
+        default=lambda record: record.as_dict(),
+    ).encode("utf-8")
+
+
+def build_timetable_payload(
+    full_path: str,
+    class_pattern: str,
+    is_exam: bool,
+    version: str,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    next_exams: int | None = None,
+) -> bytes:
     """
-    Convert lecture time to 24-hour format based on class schedule rules.
+    Extract a timetable and serialize the complete endpoint response.
 
-    Lecture timetables don't use AM/PM markers, so we infer based on context:
-    - 7:00-11:59 are morning (no conversion needed)
-    - 12:00 is noon (no conversion needed)
-    - 1:00-6:59 are afternoon (add 12 hours)
-    - If previous slot was PM, current slot might be morning continuation
+    Runs in an extraction worker process. The result is cached as-is, so a
+    cache hit is sent to the client without any parsing or reshaping.
+    Exams filtered by date are looked up in the class's date index.
 
-    Args:
-        time_str: Time string in format "HH:MM"
-        previous_was_pm: Whether the previous time slot was in PM
+    Returns:
+        UTF-8 JSON of ``{"data": ..., "version": ...}``
+    """
+    if is_exam:
+        table_data = get_exam_slots(full_path, class_pattern, date_from, date_to, next_exams)
+    else:
+        table_data = get_lecture_slots(full_path, class_pattern)
+
+    return _serialize_payload(table_data, version)
+
+
+def build_timetable_payloads(
+    full_path: str, class_patterns: list[str], is_exam: bool, version: str
+) -> dict[str, bytes]:
+    """
+    Extract and serialize the timetables of many classes from one workbook load.
+
+    Runs in an extraction worker process. Classes that fail to extract are
+    logged and left out of the result.
 
     Returns:
-        Time string in 24-hour format "HH:MM"
+        Serialized responses keyed by class pattern
+    """
+    exams = load_exam_timetable(full_path) if is_exam else None
 
-    Raises:
-        ValueError: If time string is empty or malformed
+    payloads = {}
+    for class_pattern in class_patterns:
+        try:
+            if is_exam:
+                table_data = shape_exam_slots(filter_exam_timetable(exams, class_pattern))
+            else:
+                table_data = get_lecture_slots(full_path, class_pattern)
+        except (ValueError, IndexError) as e:
+            logger.error(f"Error extracting timetable for {class_pattern}: {e}")
+            continue
+
+        payloads[class_pattern] = _serialize_payload(table_data, version)
+
+    return payloads
+
+
+def discover_class_patterns(full_path: str) -> dict[bool, list[str]]:
     """
-    if not time_str or not time_str.strip():
-        raise ValueError("Time string cannot be empty")
+    List the class patterns a draft has timetables for.
 
-    try:
-        hours, minutes = map(int, time_str.strip().split(":"))
-    except ValueError as e:
-        raise e
-
-    if not previous_was_pm:
-        # Morning hours (7:00-11:59) stay the same
-        if 7 <= hours <= 11:
-            return f"{hours}:{minutes:02d}"
-        # Noon stays the same
-        elif hours == 12:
-            return f"12:{minutes:02d}"
-        # Afternoon hours (1:00-6:59) convert to PM
-        else:
-            return f"{hours + 12}:{minutes:02d}"
-    else:
-        # If previous was PM, this might be a morning continuation
-        if hours == 12:
-            return f"12:{minutes:02d}"
-        elif hours <= 7:
-            return f"{hours + 12}:{minutes:02d}"
-        return f"{hours}:{minutes:02d}"
+    Runs in an extraction worker process. Workbooks with day sheets are
+    lecture timetables, anything else is read as an exam timetable.
 
+    Returns:
+        Class patterns keyed by is_exam
+    """
+    if is_lecture_workbook(full_path):
+        return {False: get_class_patterns(full_path)}
+    return {True: get_exam_class_patterns(full_path)}
+
+
+def make_etag(version: str, class_pattern: str, is_exam: bool) -> str:
+    """Build a strong ETag for one class's timetable from the draft version hash."""
+    timetable_type = "exam" if is_exam else "lecture"
+    tag = hashlib.md5(
+        f"{version}:{class_pattern.replace(' ', '')}:{timetable_type}".encode()
+    ).hexdigest()
+    return f'"{tag}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Check an If-None-Match header against an ETag (weak comparison, per RFC 9110)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (candidate.strip() for candidate in if_none_match.split(","))
+    return any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+def _save_profile(request: TimeTableRequest, stats: bytes) -> str:
+    """Write a profile to PROFILES_FOLDER as a .pstats file and return its name."""
+    folder = Path(settings.PROFILES_FOLDER)
+    folder.mkdir(parents=True, exist_ok=True)
+    timetable_type = "exam" if request.is_exam else "lecture"
+    name = (
+        f"{datetime.now():%Y%m%dT%H%M%S}-{request.filename.replace('.xlsx', '')}-"
+        f"{request.class_pattern.replace(' ', '')}-{timetable_type}.pstats"
+    )
+    (folder / name).write_bytes(stats)
+    return name
+
+
+async def _get_profiled_response(
+    request: TimeTableRequest, full_path: str, version: str, profile_token: str
+) -> Response:
+    """
+    Extract a timetable under cProfile, bypassing the response cache.
 
-def exams_convert_to_24hour(time_str: str, previous_was_pm: bool = False) -> str:
+    The extraction runs in the extraction pool as on a draft's first request,
+    parsing the draft from Excel rather than taking it from the worker's memory
+    or a snapshot. The hottest functions are returned in the X-Profile-Top
+    header and, if PROFILES_FOLDER is set, the full profile is kept there as a
+    .pstats file.
     """
-    Convert exam time to 24-hour format with explicit AM/PM markers.
+    if not settings.PROFILING_TOKEN or not hmac.compare_digest(
+        profile_token.encode(), settings.PROFILING_TOKEN.encode()
+    ):
+        raise HTTPException(status_code=403, detail="Request profiling is not allowed")
+
+    try:
+        payload, profile = await run_extraction(
+            profile_cold_call,
+            settings.PROFILING_TOP_N,
+            build_timetable_payload,
+            full_path,
+            request.class_pattern,
+            request.is_exam,
+            version,
+            request.date_from,
+            request.date_to,
+            request.next,
+        )
+    except ExtractionQueueFull as e:
+        logger.warning(f"Rejecting profiled timetable request: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail="Timetable extraction is busy, please retry shortly",
+            headers={"Retry-After": str(settings.EXTRACTION_RETRY_AFTER)},
+        )
+
+    headers = {
+        "Cache-Control": "no-store",
+        "Server-Timing": f"extraction;dur={profile.seconds * 1000:.1f}",
+        "X-Profile-Top": "; ".join(profile.top),
+    }
+    if settings.PROFILES_FOLDER:
+        headers["X-Profile-Stats"] = await asyncio.to_thread(_save_profile, request, profile.stats)
+
+    return Response(content=payload, media_type="application/json", headers=headers)
 
-    Exam timetables include explicit AM/PM markers, so conversion is straightforward:
-    - AM times: 12:00 AM → 00:00, other AM times stay the same
-    - PM times: Add 12 hours (except 12:00 PM)
+
+async def get_time_table_response(
+    request: TimeTableRequest, if_none_match: str | None, profile_token: str | None = None
+) -> Response:
+    """
+    Build the timetable response, answering 304 when the client's copy is current.
 
     Args:
-        time_str: Time string with AM/PM marker (e.g., "9:00 AM", "2:00 PM")
-        previous_was_pm: Unused parameter for API consistency
+        request: TimeTableRequest with filename, class_pattern, and is_exam flag
+        if_none_match: The client's If-None-Match header, if any
+        profile_token: The client's X-Profile header, if any. With the configured
+            PROFILING_TOKEN the extraction is profiled instead of served from cache
 
     Returns:
-        Time string in 24-hour format "HH:MM"
+        JSON response with an ETag, or an empty 304 response
 
     Raises:
-        ValueError: If time string is empty or malformed
+        HTTPException: 400 if dates are given for a lecture timetable,
+            403 if an X-Profile header doesn't carry the profiling token,
+            404 if Excel file doesn't exist
     """
-    if not time_str or not time_str.strip():
-        raise ValueError("Time string cannot be empty")
+    # Normalize filename for consistency
+    base_filename = request.filename.replace(".xlsx", "")
+    filename = f"{base_filename}.xlsx"
 
+    # Content hash for version tracking and change detection; memoized per file stat
+    file_path = os.path.join(DRAFTS_FOLDER, filename)
     try:
-        time_str = time_str.strip().upper()
-        is_pm = "PM" in time_str
-        time_clean = time_str.replace("AM", "").replace("PM", "").strip()
-        hours, minutes = map(int, time_clean.split(":"))
+        content_hash = get_file_hash(file_path)
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=404, detail=f"Timetable file not found: {file_path}"
+        )
+
+    if request.has_date_filter and not request.is_exam:
+        raise HTTPException(
+            status_code=400, detail="from, to and next only apply to exam timetables"
+        )
+
+    if profile_token is not None:
+        return await _get_profiled_response(request, file_path, content_hash, profile_token)
+
+    headers = {
+        "ETag": make_etag(content_hash, request.cache_pattern, request.is_exam),
+        "Cache-Control": "public, no-cache",
+    }
+
+    # The client already has this version: no cache lookup, no body
+    if etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
 
-        # Convert to 24-hour format
-        if is_pm and hours != 12:
-            hours += 12
-        elif not is_pm and hours == 12:
-            hours = 0
+    payload = await get_timetable_payload(request, content_hash)
 
-        return f"{hours:02d}:{minutes:02d}"
-    except ValueError as e:
-        logger.error(f"Error converting time: {time_str} - {e}")
-        raise
+    return Response(content=payload, media_type="application/json", headers=headers)
 
 
 @router.post("/get_time_table")
-async def get_time_table_endpoint(request: TimeTableRequest):
+async def get_time_table_endpoint(
+    request: TimeTableRequest,
+    if_none_match: str | None = Header(default=None),
+    x_profile: str | None = Header(default=None),
+):
     """
     Main endpoint for generating parsed JSON timetable (lecture or exam).
 
     This endpoint processes Excel timetable files and returns structured JSON data.
     It implements file change detection via content hashing and supports both
-    lecture and exam timetable formats.
+    lecture and exam timetable formats. The response body is cached pre-serialized.
+    Responses carry an ETag derived from the draft version; a matching
+    If-None-Match gets a 304 without a body. Admins can profile the extraction
+    of a request by sending the profiling token in an X-Profile header.
 
     Args:
-        request: TimeTableRequest with filename, class_pattern, and is_exam flag
+        request: TimeTableRequest with filename, class_pattern, and is_exam flag,
+            and for exams optionally ``from``/``to`` dates and ``next``
 
     Returns:
-        Dictionary containing:
+        JSON response containing:
         - data: Structured timetable information
         - version: MD5 hash of source file for change detection
 
     Raises:
-        FileNotFoundError: If Excel file doesn't exist
+        HTTPException: 400 if dates are given for a lecture timetable,
+            403 if an X-Profile header doesn't carry the profiling token,
+            404 if Excel file doesn't exist
     """
-    # Normalize filename for consistency
-    base_filename = request.filename.replace(".xlsx", "")
-    filename = f"{base_filename}.xlsx"
+    return await get_time_table_response(request, if_none_match, x_profile)
+
+
+def get_time_table_query(
+    filename: str,
+    class_pattern: str,
+    is_exam: bool = False,
+    date_from: date | None = Query(default=None, alias="from"),
+    date_to: date | None = Query(default=None, alias="to"),
+    next: int | None = Query(default=None, ge=1, le=MAX_NEXT_EXAMS),
+) -> TimeTableRequest:
+    """Read a TimeTableRequest from query parameters, accepting ``from`` and ``to`` as names."""
+    return TimeTableRequest(
+        filename=filename,
+        class_pattern=class_pattern,
+        is_exam=is_exam,
+        date_from=date_from,
+        date_to=date_to,
+        next=next,
+    )
+
+
+@router.get("/get_time_table")
+async def get_time_table_get_endpoint(
+    request: TimeTableRequest = Depends(get_time_table_query),
+    if_none_match: str | None = Header(default=None),
+    x_profile: str | None = Header(default=None),
+):
+    """
+    Cacheable GET variant of the timetable endpoint, taking the request as query parameters.
 
-    # Pre-check cache to trigger file processing if needed
-    _ = get_table_from_cache(base_filename, request.class_pattern, request.is_exam)
+    Browsers and CDNs can store the response and revalidate it with If-None-Match.
+    """
+    return await get_time_table_response(request, if_none_match, x_profile)
 
-    # Generate content hash for version tracking and change detection
-    file_path = os.path.join(DRAFTS_FOLDER, filename)
-    if not os.path.exists(file_path):
-        raise FileNotFoundError(f"Timetable file not found: {file_path}")
 
-    with open(file_path, "rb") as f:
-        content_hash = hashlib.md5(f.read()).hexdigest()
+def _batch_line(class_pattern: str, is_exam: bool, payload: bytes) -> bytes:
+    """Prefix a cached response with its class so it can be sent as one NDJSON line."""
+    prefix = json.dumps(
+        {"class_pattern": class_pattern, "is_exam": is_exam}, ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+    return prefix[:-1] + b"," + payload[1:] + b"\n"
 
-    # Get processed JSON data
-    days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
-    json_data = get_json_table(request)
 
-    if request.is_exam:
-        table_data = []
-        for entry in json_data:
-            date = entry.get("DATE")
-            if not date:
-                continue
+def _batch_error_line(class_pattern: str, is_exam: bool, error: str) -> bytes:
+    return json.dumps(
+        {"class_pattern": class_pattern, "is_exam": is_exam, "error": error},
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode("utf-8") + b"\n"
 
-            try:
-                start_24h = exams_convert_to_24hour(entry.get("START", ""))
-                end_24h = exams_convert_to_24hour(entry.get("END", ""))
-            except ValueError as e:
-                logger.error(f"Invalid time format in exam entry: {entry} - {e}")
-                continue
-
-            table_data.append(
-                {
-                    "day": date,
-                    "data": [
-                        {
-                            "start": start_24h,
-                            "end": end_24h,
-                            "value": entry.get("COURSE NAME", ""),
-                            "class": entry.get("CLASS", ""),
-                            "location": entry.get("LECTURE HALL", ""),
-                            "invigilator": entry.get("INVIGILATOR (UPDATED)", ""),
-                        }
-                    ],
-                }
+
+@router.post("/get_time_table/batch")
+async def get_time_table_batch_endpoint(request: BatchTimeTableRequest):
+    """
+    Get the timetables of many classes in one draft as streamed NDJSON.
+
+    All classes are looked up in one cache round trip. Misses of each timetable
+    type are extracted together from a single workbook load in the extraction
+    pool and cached. Cache hits are streamed while the misses are being extracted.
+    Classes missing from the draft's loaded class catalogue get an error line
+    without being extracted.
+
+    Args:
+        request: BatchTimeTableRequest with filename, class_patterns and timetable_types
+
+    Returns:
+        One JSON line per (class_pattern, type), containing either the same
+        ``data``/``version`` as get_time_table or an ``error``
+
+    Raises:
+        HTTPException: 404 if Excel file doesn't exist
+    """
+    base_filename = request.filename.replace(".xlsx", "")
+    full_path = os.path.join(DRAFTS_FOLDER, f"{base_filename}.xlsx")
+    try:
+        version = get_file_hash(full_path)
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=404, detail=f"Timetable file not found: {full_path}"
+        )
+
+    queries = [
+        (class_pattern, timetable_type == "exam")
+        for timetable_type in dict.fromkeys(request.timetable_types)
+        for class_pattern in dict.fromkeys(request.class_patterns)
+    ]
+    cached = await get_tables_from_cache(base_filename, version, queries)
+
+    catalogue = get_loaded_catalogue(base_filename, version)
+    missing: dict[bool, list[str]] = {}
+    unknown: list[tuple[str, bool]] = []
+    for (class_pattern, is_exam), payload in cached.items():
+        if payload is not None:
+            continue
+        if catalogue is not None and not catalogue.has_class(class_pattern):
+            unknown.append((class_pattern, is_exam))
+        else:
+            missing.setdefault(is_exam, []).append(class_pattern)
+
+    async def extract_missing(is_exam: bool, class_patterns: list[str]) -> dict[str, bytes]:
+        payloads = await run_extraction(
+            build_timetable_payloads, full_path, class_patterns, is_exam, version
+        )
+        if payloads:
+            await add_tables_to_cache(
+                base_filename,
+                version,
+                {(class_pattern, is_exam): payload for class_pattern, payload in payloads.items()},
             )
-    else:
-        table_data = []
-        for index, day in enumerate(json_data):
-            day_data = []
-            current_slot = None
-            previous_was_pm = False
-
-            for key, value in day.items():
-                if not key or not isinstance(key, str):
-                    continue
-
-                time_parts = key.split("-")
-                if len(time_parts) < 2:
-                    continue
-
-                start = time_parts[0].strip()
-                end = time_parts[-1].strip()
-
-                if not start or not end:
-                    continue
-
-                try:
-                    start_24h = lectures_convert_to_24hour(start)
-                    start_hour = int(start_24h.split(":")[0])
-                    is_pm = start_hour >= 12
-                    end_24h = lectures_convert_to_24hour(end, previous_was_pm)
-
-                    if (
-                        current_slot
-                        and current_slot["value"] == value
-                        and current_slot["end"] == start_24h
-                    ):
-                        current_slot["end"] = end_24h
-                    else:
-                        if current_slot:
-                            day_data.append(current_slot)
-                        current_slot = {
-                            "start": start_24h,
-                            "end": end_24h,
-                            "value": value,
-                        }
-
-                    previous_was_pm = is_pm
-                except ValueError as e:
-                    logger.error(f"Error processing lecture time slot {key}: {e}")
-                    continue
-
-            if current_slot:
-                day_data.append(current_slot)
-
-            table_data.append({"day": days[index], "data": day_data})
-
-    return {
-        "data": table_data,
-        "version": content_hash,
-    }
+        return payloads
+
+    async def stream():
+        extractions = {
+            is_exam: asyncio.ensure_future(extract_missing(is_exam, class_patterns))
+            for is_exam, class_patterns in missing.items()
+        }
+
+        for (class_pattern, is_exam), payload in cached.items():
+            if payload is not None:
+                yield _batch_line(class_pattern, is_exam, payload)
+
+        for class_pattern, is_exam in unknown:
+            yield _batch_error_line(class_pattern, is_exam, "Class not found in this draft")
+
+        for is_exam, extraction in extractions.items():
+            try:
+                payloads = await extraction
+                error = "Timetable could not be extracted for this class"
+            except ExtractionQueueFull:
+                payloads = {}
+                error = "Timetable extraction is busy, please retry shortly"
+            except Exception as e:
+                logger.error(f"Error extracting batch from {full_path}: {e}")
+                payloads = {}
+                error = "Timetable could not be extracted"
+
+            for class_pattern in missing[is_exam]:
+                if class_pattern in payloads:
+                    yield _batch_line(class_pattern, is_exam, payloads[class_pattern])
+                else:
+                    yield _batch_error_line(class_pattern, is_exam, error)
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
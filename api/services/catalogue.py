@@ -0,0 +1,101 @@
+import logging
+import re
+from bisect import bisect_left
+from typing import Iterable
+
+from api.extract.classes import ClassMention
+from api.extract.extract_exam_table import get_exam_class_mentions
+from api.extract.extract_lectures_table import get_class_mentions, is_lecture_workbook
+from api.services.extraction import run_extraction
+from api.services.singleflight import single_flight
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_class_name(name: str) -> str:
+    """Compare class names without case or spacing, so "ce 4a" finds "CE 4A"."""
+    return re.sub(r"\s+", "", name).upper()
+
+
+class ClassCatalogue:
+    """
+    Every class, section and course code of a draft, searchable by prefix.
+
+    Entries are kept in one array sorted by normalized name, so a prefix
+    search is a binary search to the first match and a scan over the matches.
+    """
+
+    def __init__(self, mentions: Iterable[ClassMention]):
+        self.entries = sorted(set(mentions), key=lambda mention: (normalize_class_name(mention.name), mention.kind))
+        self._keys = [normalize_class_name(mention.name) for mention in self.entries]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def search(self, prefix: str, limit: int) -> list[ClassMention]:
+        """Entries whose name starts with the prefix, in name order."""
+        key = normalize_class_name(prefix)
+        start = bisect_left(self._keys, key)
+
+        matches = []
+        for position in range(start, min(start + limit, len(self._keys))):
+            if not self._keys[position].startswith(key):
+                break
+            matches.append(self.entries[position])
+
+        return matches
+
+    def has_class(self, class_pattern: str) -> bool:
+        """Whether any class, section or course code starts with the pattern, as extraction matches them."""
+        return bool(self.search(class_pattern, limit=1))
+
+
+def list_class_mentions(full_path: str) -> list[ClassMention]:
+    """
+    Find every class, section and course code of a lecture or exam draft.
+
+    Runs in an extraction worker process.
+    """
+    if is_lecture_workbook(full_path):
+        return list(get_class_mentions(full_path))
+    return list(get_exam_class_mentions(full_path))
+
+
+# The latest catalogue of each draft, as (version, catalogue)
+_catalogues: dict[str, tuple[str, ClassCatalogue]] = {}
+
+
+def get_loaded_catalogue(base_filename: str, version: str) -> ClassCatalogue | None:
+    """The catalogue of a draft version if it was already built, without building it."""
+    loaded = _catalogues.get(base_filename)
+    if loaded is None or loaded[0] != version:
+        return None
+    return loaded[1]
+
+
+async def get_class_catalogue(base_filename: str, full_path: str, version: str) -> ClassCatalogue:
+    """
+    Get the catalogue of a draft version, building it in the extraction pool once.
+
+    Args:
+        base_filename: Draft name without extension
+        full_path: Path of the draft
+        version: Content hash of the draft
+
+    Returns:
+        The draft's class catalogue
+
+    Raises:
+        ExtractionQueueFull: If the extraction queue is full
+    """
+    catalogue = get_loaded_catalogue(base_filename, version)
+    if catalogue is not None:
+        return catalogue
+
+    async def build() -> ClassCatalogue:
+        catalogue = ClassCatalogue(await run_extraction(list_class_mentions, full_path))
+        _catalogues[base_filename] = (version, catalogue)
+        logger.info(f"Built class catalogue of {base_filename} ({len(catalogue)} entries)")
+        return catalogue
+
+    return await single_flight(f"catalogue:{base_filename}:{version}", build)
@@ -0,0 +1,83 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, TypeVar
+
+from api.config.redis_config import settings
+from api.services.metrics import merge_recorded, run_recorded, span
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class ExtractionQueueFull(Exception):
+    """Raised when every extraction worker is busy and the queue is full."""
+
+
+_executor: ProcessPoolExecutor | None = None
+_pending = 0
+
+
+def get_worker_count() -> int:
+    return settings.EXTRACTION_WORKERS or os.cpu_count() or 1
+
+
+def get_pending_count() -> int:
+    """Number of extractions currently running or waiting for a worker."""
+    return _pending
+
+
+def start_extraction_pool():
+    """Start the extraction process pool. Called from the FastAPI lifespan."""
+    global _executor
+    workers = get_worker_count()
+    # spawn: forking a process that already runs an event loop and threads is unsafe
+    _executor = ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    )
+    logger.info(f"Extraction pool started with {workers} workers")
+
+
+def shutdown_extraction_pool():
+    """Stop the extraction process pool on shutdown."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def run_extraction(func: Callable[..., T], *args) -> T:
+    """
+    Run a CPU-bound extraction in the process pool without blocking the event loop.
+
+    At most ``workers + EXTRACTION_QUEUE_SIZE`` extractions may be pending at once.
+    Beyond that the caller is rejected instead of waiting, so latency stays bounded.
+    Without a started pool (e.g. in tests) the default thread pool is used.
+    Metrics the job records in the worker are merged into this process's.
+
+    Args:
+        func: A picklable, module-level function
+        *args: Picklable arguments for ``func``
+
+    Returns:
+        The return value of ``func``
+
+    Raises:
+        ExtractionQueueFull: If the extraction queue is full
+    """
+    global _pending
+    if _pending >= get_worker_count() + settings.EXTRACTION_QUEUE_SIZE:
+        raise ExtractionQueueFull(f"{_pending} extractions already pending")
+
+    _pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        with span("extraction"):
+            result, recorded = await loop.run_in_executor(_executor, run_recorded, func, *args)
+        merge_recorded(recorded)
+        return result
+    finally:
+        _pending -= 1
@@ -0,0 +1,66 @@
+import hashlib
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import NamedTuple
+
+from api.services.metrics import span
+
+logger = logging.getLogger(__name__)
+
+_CHUNK_SIZE = 1024 * 1024
+
+
+class FileStat(NamedTuple):
+    """The parts of a file's stat that change whenever its content does."""
+
+    inode: int
+    size: int
+    mtime_ns: int
+
+
+_fingerprints: dict[str, tuple[FileStat, str]] = {}
+_lock = threading.Lock()
+
+
+@span("fingerprint")
+def _hash_file(path: str) -> str:
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_file_hash(path: str | Path) -> str:
+    """
+    Get the MD5 content hash of a file, reading it only when it has changed.
+
+    The hash is memoized against the file's inode, size and modification time,
+    so repeated calls for an unchanged draft cost a single ``stat``.
+
+    Args:
+        path: Path to the file
+
+    Returns:
+        Hex digest of the file content
+
+    Raises:
+        FileNotFoundError: If the file doesn't exist
+    """
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    file_stat = FileStat(st.st_ino, st.st_size, st.st_mtime_ns)
+
+    cached = _fingerprints.get(path)
+    if cached and cached[0] == file_stat:
+        return cached[1]
+
+    content_hash = _hash_file(path)
+    with _lock:
+        _fingerprints[path] = (file_stat, content_hash)
+    logger.info(f"Fingerprinted {path}: {content_hash}")
+
+    return content_hash
+
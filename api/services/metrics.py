@@ -0,0 +1,196 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+# Upper bounds in seconds, from a memoized lookup to a cold parse of a large draft
+DURATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+STAGE_SECONDS = "easechaos_stage_duration_seconds"
+
+_HELP = {
+    STAGE_SECONDS: "Time spent in each stage of serving a timetable",
+    "easechaos_request_duration_seconds": "Time to answer an HTTP request, by route",
+    "easechaos_cache_lookups_total": "Timetable cache lookups, by layer and result",
+    "easechaos_draft_parses_total": "Drafts parsed from Excel (not loaded from a snapshot), by draft and kind",
+    "easechaos_snapshot_loads_total": "Parsed drafts loaded from an on-disk snapshot, by kind",
+    "easechaos_extraction_queue_depth": "Extractions running or waiting for a worker",
+    "easechaos_l1_cache_entries": "Responses in this worker's in-process cache",
+    "easechaos_l1_cache_bytes": "Size of the responses in this worker's in-process cache",
+}
+
+Labels = tuple[tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count of observed durations, as Prometheus exposes them."""
+
+    def __init__(self, buckets: tuple[float, ...] = DURATION_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """
+    Counters and histograms of one process, rendered in the Prometheus text format.
+
+    Metrics are identified by name and labels, and created on first use.
+    """
+
+    def __init__(self):
+        self.counters: dict[tuple[str, Labels], float] = {}
+        self.histograms: dict[tuple[str, Labels], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, amount: float = 1, **labels: str):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels: str):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def clear(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def render(self, gauges: dict[tuple[str, Labels], float] | None = None) -> str:
+        """
+        Render every metric in the Prometheus text exposition format (version 0.0.4).
+
+        Args:
+            gauges: Values read at scrape time, e.g. the current queue depth
+
+        Returns:
+            The exposition text
+        """
+        with self._lock:
+            counters = dict(self.counters)
+            histograms = {
+                key: (list(histogram.counts), histogram.sum, histogram.count, histogram.buckets)
+                for key, histogram in self.histograms.items()
+            }
+
+        lines = []
+        for metric_type, samples in (("counter", counters), ("gauge", gauges or {})):
+            for name in sorted({name for name, _ in samples}):
+                lines += _header(name, metric_type)
+                for (sample_name, labels), value in sorted(samples.items()):
+                    if sample_name == name:
+                        lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+        for name in sorted({name for name, _ in histograms}):
+            lines += _header(name, "histogram")
+            for (sample_name, labels), (counts, total, count, buckets) in sorted(histograms.items()):
+                if sample_name != name:
+                    continue
+                cumulative = 0
+                for bound, bucket_count in zip((*buckets, "+Inf"), counts):
+                    cumulative += bucket_count
+                    bucket_labels = labels + (("le", bound if bound == "+Inf" else repr(bound)),)
+                    lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+                lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _header(name: str, metric_type: str) -> list[str]:
+    lines = [f"# HELP {name} {_HELP[name]}"] if name in _HELP else []
+    return lines + [f"# TYPE {name} {metric_type}"]
+
+
+def _escape_label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label_value(value)}"' for key, value in labels) + "}"
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+registry = MetricsRegistry()
+
+# Set while an extraction job runs, so its metrics travel back with its result
+_recorded: ContextVar[list | None] = ContextVar("recorded_metrics", default=None)
+
+
+def inc(name: str, amount: float = 1, **labels: str):
+    """Increment a counter of this process, or of the extraction job being recorded."""
+    recorded = _recorded.get()
+    if recorded is not None:
+        recorded.append(("inc", name, amount, labels))
+    else:
+        registry.inc(name, amount, **labels)
+
+
+def observe(name: str, value: float, **labels: str):
+    """Add an observation to a histogram of this process, or of the extraction job being recorded."""
+    recorded = _recorded.get()
+    if recorded is not None:
+        recorded.append(("observe", name, value, labels))
+    else:
+        registry.observe(name, value, **labels)
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """
+    Time a stage into the stage duration histogram.
+
+    Usable as ``with span("read_workbook"):`` or as a decorator.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(STAGE_SECONDS, time.perf_counter() - start, stage=stage)
+
+
+def run_recorded(func: Callable[..., T], *args) -> tuple[T, list]:
+    """
+    Run an extraction job and collect the metrics it records instead of applying them.
+
+    Jobs run in worker processes whose registries are never scraped, so their
+    metrics are returned with the result and merged by the API process.
+
+    Returns:
+        The job's result and its recorded metrics, for merge_recorded
+    """
+    recorded = []
+    token = _recorded.set(recorded)
+    try:
+        return func(*args), recorded
+    finally:
+        _recorded.reset(token)
+
+
+def merge_recorded(recorded: list):
+    """Apply metrics recorded by run_recorded to this process's registry."""
+    for kind, name, value, labels in recorded:
+        if kind == "inc":
+            registry.inc(name, value, **labels)
+        else:
+            registry.observe(name, value, **labels)
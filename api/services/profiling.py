@@ -0,0 +1,96 @@
+import cProfile
+import marshal
+import os
+import pstats
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, NamedTuple, TypeVar
+
+from api.extract import extract_exam_table, extract_lectures_table
+from api.extract.snapshots import ignoring_snapshots
+
+T = TypeVar("T")
+
+# Every draft a worker parsed, as workbook indexes, sheet indexes, exam rows and exam date indexes
+_PARSED_DRAFTS = (
+    extract_lectures_table._workbook_indexes,
+    extract_lectures_table._sheet_indexes,
+    extract_exam_table._exam_timetables,
+    extract_exam_table._exam_date_indexes,
+)
+
+
+class Profile(NamedTuple):
+    """The outcome of profiling one call."""
+
+    seconds: float
+    # "file:line(function) total ms" of the functions with the most own time, hottest first
+    top: list[str]
+    # The raw profiler stats, in the format of pstats.Stats.dump_stats
+    stats: bytes
+
+
+def profile_call(top_n: int, func: Callable[..., T], *args) -> tuple[T, Profile]:
+    """
+    Run a function under cProfile.
+
+    Meant to run in an extraction worker, so the profile covers the extraction
+    exactly as a cache miss would run it. See profile_cold_call to also cover
+    parsing drafts the worker already has.
+
+    Args:
+        top_n: Number of hot functions to summarize
+        func: A picklable, module-level function
+        *args: Picklable arguments for ``func``
+
+    Returns:
+        The return value of ``func`` and its profile
+    """
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    result = profiler.runcall(func, *args)
+    seconds = time.perf_counter() - start
+
+    stats = pstats.Stats(profiler)
+    hottest = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:top_n]
+    top = [
+        f"{os.path.basename(filename)}:{line}({function}) {own_time * 1000:.1f}ms"
+        for (filename, line, function), (_, _, own_time, _, _) in hottest
+    ]
+
+    return result, Profile(seconds, top, marshal.dumps(stats.stats))
+
+
+@contextmanager
+def _parsed_drafts_set_aside():
+    """Empty the worker's parsed drafts within the block, then put them back as they were."""
+    kept = [OrderedDict(parsed) for parsed in _PARSED_DRAFTS]
+    for parsed in _PARSED_DRAFTS:
+        parsed.clear()
+    try:
+        yield
+    finally:
+        for parsed, entries in zip(_PARSED_DRAFTS, kept):
+            parsed.clear()
+            parsed.update(entries)
+
+
+def profile_cold_call(top_n: int, func: Callable[..., T], *args) -> tuple[T, Profile]:
+    """
+    Run a function under cProfile as if its worker never saw a draft.
+
+    Drafts are parsed from their Excel files rather than taken from memory or
+    a snapshot, so the profile covers reading the workbook and its merged cells.
+    The worker's parsed drafts are put back afterwards, later jobs stay warm.
+
+    Args:
+        top_n: Number of hot functions to summarize
+        func: A picklable, module-level function
+        *args: Picklable arguments for ``func``
+
+    Returns:
+        The return value of ``func`` and its profile
+    """
+    with _parsed_drafts_set_aside(), ignoring_snapshots():
+        return profile_call(top_n, func, *args)
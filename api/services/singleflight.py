@@ -0,0 +1,34 @@
+import asyncio
+from typing import Awaitable, Callable, TypeVar
+
+T = TypeVar("T")
+
+_inflight: dict[str, asyncio.Task] = {}
+
+
+async def single_flight(key: str, func: Callable[[], Awaitable[T]]) -> T:
+    """
+    Run ``func`` once per key at a time; concurrent callers share its result.
+
+    The first caller for a key starts the work as a task, later callers await the
+    same task. A caller that is cancelled does not cancel the shared work.
+
+    Args:
+        key: Identifies the work, e.g. the versioned cache key
+        func: Coroutine function producing the result
+
+    Returns:
+        The result of the single shared call
+    """
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(func())
+        _inflight[key] = task
+
+        def _forget(done: asyncio.Task):
+            if _inflight.get(key) is done:
+                del _inflight[key]
+
+        task.add_done_callback(_forget)
+
+    return await asyncio.shield(task)
@@ -0,0 +1,247 @@
+import asyncio
+import logging
+import os
+from pathlib import Path
+from typing import Awaitable, Callable, TypeVar
+
+from watchfiles import Change, awatch
+
+from api.config.redis_config import (
+    DRAFTS_FOLDER,
+    settings,
+    get_tables_from_cache,
+    add_tables_to_cache,
+    acquire_lock,
+    release_lock,
+)
+from api.routes.timetable import build_timetable_payloads, discover_class_patterns
+from api.services.catalogue import get_class_catalogue
+from api.services.extraction import ExtractionQueueFull, run_extraction
+from api.services.fingerprint import get_file_hash
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def is_draft_file(path: str) -> bool:
+    """Excel drafts, ignoring the lock and temp files office suites leave next to them."""
+    name = os.path.basename(path)
+    return name.endswith(".xlsx") and not name.startswith(("~$", "."))
+
+
+class DraftWatcher:
+    """
+    Watch the drafts folder and pre-extract every timetable of new or changed drafts.
+
+    Drafts are fingerprinted, their class patterns discovered and all their
+    timetables extracted in the extraction pool and cached, so the first
+    student asking for a class after a draft lands gets a cache hit. Changes
+    are picked up with inotify, or by polling if inotify is unavailable.
+    """
+
+    def __init__(self, folder: str | Path):
+        self.folder = str(folder)
+        self.watch_mode: str | None = None
+        self.drafts: dict[str, dict] = {}
+        self._queue: asyncio.Queue[str] = asyncio.Queue()
+        self._queued: set[str] = set()
+        self._tasks: list[asyncio.Task] = []
+
+    def start(self):
+        """Queue the drafts already in the folder and start watching it."""
+        for name in sorted(os.listdir(self.folder)):
+            if is_draft_file(name):
+                self.enqueue(os.path.join(self.folder, name))
+
+        self._tasks = [
+            asyncio.ensure_future(self._watch()),
+            asyncio.ensure_future(self._warm_queued()),
+        ]
+        logger.info(f"Watching {self.folder} for new drafts")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def enqueue(self, path: str):
+        """Queue a draft for warming, once even if it changes several times meanwhile."""
+        if path in self._queued:
+            return
+        self._queued.add(path)
+        self._queue.put_nowait(path)
+        self.drafts.setdefault(os.path.basename(path), _new_status(None))
+
+    def status(self) -> dict:
+        return {
+            "enabled": True,
+            "watch_mode": self.watch_mode,
+            "queued": self._queue.qsize(),
+            "drafts": self.drafts,
+        }
+
+    async def _watch(self):
+        force_polling = False
+        while True:
+            self.watch_mode = "polling" if force_polling else "inotify"
+            try:
+                async for changes in awatch(
+                    self.folder,
+                    watch_filter=lambda change, path: is_draft_file(path),
+                    force_polling=force_polling,
+                    poll_delay_ms=settings.WARMUP_POLL_INTERVAL * 1000,
+                    recursive=False,
+                ):
+                    for change, path in changes:
+                        if change == Change.deleted:
+                            self.drafts.pop(os.path.basename(path), None)
+                        else:
+                            self.enqueue(path)
+                return
+            except Exception as e:
+                if force_polling:
+                    self.watch_mode = None
+                    logger.error(f"Stopped watching {self.folder}: {e}")
+                    return
+                # e.g. the inotify watch limit is reached
+                logger.warning(f"inotify unavailable for {self.folder}, polling instead: {e}")
+                force_polling = True
+
+    async def _warm_queued(self):
+        while True:
+            path = await self._queue.get()
+            self._queued.discard(path)
+            try:
+                await self.warm(path)
+            except Exception as e:
+                logger.error(f"Error warming {path}: {e}")
+                status = self.drafts.get(os.path.basename(path))
+                if status is not None:
+                    status.update(state="failed", error=str(e))
+
+    async def warm(self, path: str):
+        """
+        Extract and cache every timetable of one draft version.
+
+        Timetables already in the cache are skipped, so warming a draft again
+        only extracts what is missing. Each draft version is warmed by one API
+        worker at a time: the others skip it while it holds the warm-up lock.
+
+        Args:
+            path: Path of the draft
+        """
+        filename = os.path.basename(path)
+        base_filename = filename.removesuffix(".xlsx")
+        if not os.path.exists(path):
+            self.drafts.pop(filename, None)
+            return
+
+        version = await asyncio.to_thread(get_file_hash, path)
+        status = self.drafts.get(filename)
+        if status and status["version"] == version and status["state"] == "warm":
+            return
+
+        status = _new_status(version)
+        self.drafts[filename] = status
+
+        lock_name = f"warmup:{base_filename}:{version}"
+        token = await acquire_lock(lock_name, settings.WARMUP_LOCK_TIMEOUT)
+        if token is None:
+            status["state"] = "warming_elsewhere"
+            logger.info(f"Not warming {filename} ({version}), another worker is")
+            return
+
+        try:
+            await self._warm_version(path, status)
+        finally:
+            await release_lock(lock_name, token)
+
+    async def _warm_version(self, path: str, status: dict):
+        """Discover the classes of a draft version and cache their timetables, batch by batch."""
+        filename = os.path.basename(path)
+        base_filename = filename.removesuffix(".xlsx")
+        version = status["version"]
+
+        status["state"] = "discovering"
+        class_patterns = await self._retry(lambda: run_extraction(discover_class_patterns, path))
+        # Loaded catalogues let requests for unknown classes be rejected without extraction
+        await self._retry(lambda: get_class_catalogue(base_filename, path, version))
+
+        status["state"] = "warming"
+        for is_exam, patterns in class_patterns.items():
+            progress = status["exam" if is_exam else "lecture"]
+            progress["total"] = len(patterns)
+
+            for start in range(0, len(patterns), settings.WARMUP_BATCH_SIZE):
+                # A newer version is queued by the watcher, stop spending work on this one
+                if await asyncio.to_thread(get_file_hash, path) != version:
+                    status["state"] = "outdated"
+                    return
+
+                batch = patterns[start : start + settings.WARMUP_BATCH_SIZE]
+                cached = await get_tables_from_cache(
+                    base_filename, version, [(pattern, is_exam) for pattern in batch]
+                )
+                missing = [pattern for (pattern, _), payload in cached.items() if payload is None]
+
+                if missing:
+                    payloads = await self._retry(
+                        lambda: run_extraction(build_timetable_payloads, path, missing, is_exam, version)
+                    )
+                    if payloads:
+                        await add_tables_to_cache(
+                            base_filename,
+                            version,
+                            {(pattern, is_exam): payload for pattern, payload in payloads.items()},
+                        )
+                progress["done"] += len(batch)
+
+        status["state"] = "warm"
+        logger.info(f"Warmed {filename} ({version})")
+
+    async def _retry(self, extract: Callable[[], Awaitable[T]]) -> T:
+        """Run an extraction, waiting for room in the queue rather than failing."""
+        while True:
+            try:
+                return await extract()
+            except ExtractionQueueFull:
+                await asyncio.sleep(settings.EXTRACTION_RETRY_AFTER)
+
+
+def _new_status(version: str | None) -> dict:
+    return {
+        "version": version,
+        "state": "queued",
+        "lecture": {"total": 0, "done": 0},
+        "exam": {"total": 0, "done": 0},
+        "error": None,
+    }
+
+
+watcher: DraftWatcher | None = None
+
+
+def start_draft_watcher():
+    """Start warming drafts in the background. Called from the FastAPI lifespan."""
+    global watcher
+    if not settings.WARMUP_ENABLED:
+        return
+    watcher = DraftWatcher(DRAFTS_FOLDER)
+    watcher.start()
+
+
+async def stop_draft_watcher():
+    """Stop the draft watcher on shutdown."""
+    global watcher
+    if watcher is not None:
+        await watcher.stop()
+        watcher = None
+
+
+def get_warmup_status() -> dict:
+    """Warm-up progress of every draft, for the status endpoint."""
+    if watcher is None:
+        return {"enabled": False, "watch_mode": None, "queued": 0, "drafts": {}}
+    return watcher.status()
@@ -0,0 +1,54 @@
+from pathlib import Path
+
+from api.benchmarks.run import find_regressions
+from api.benchmarks.synthetic import scale_draft
+from api.extract.extract_lectures_table import get_class_patterns, get_lecture_slots
+from api.extract.readers import read_merged_ranges
+
+LECTURE_DRAFT = Path(__file__).parents[1] / "drafts" / "Draft_2.xlsx"
+
+
+def _slot_dicts(filename, class_pattern):
+    return [day.as_dict() for day in get_lecture_slots(str(filename), class_pattern)]
+
+
+def _count_rooms(filename, class_pattern):
+    """Count the (class, room) lines over every slot of a class."""
+    return sum(
+        slot["value"].count("\n") + 1
+        for day in _slot_dicts(filename, class_pattern)
+        for slot in day["data"]
+        if slot["value"]
+    )
+
+
+def test_synthetic_draft_repeats_rooms_slots_and_merged_cells(mocker, tmp_path):
+    """A draft scaled once serves the same timetables, scaled three times every class has three times the rooms."""
+    # Arrange
+    mocker.patch("api.extract.snapshots.SNAPSHOTS_FOLDER", tmp_path / "snapshots")
+
+    # Act
+    once = scale_draft(LECTURE_DRAFT, tmp_path / "once.xlsx", 1)
+    thrice = scale_draft(LECTURE_DRAFT, tmp_path / "thrice.xlsx", 3)
+
+    # Assert
+    assert get_class_patterns(str(thrice)) == get_class_patterns(str(LECTURE_DRAFT))
+    assert _slot_dicts(once, "CE 4") == _slot_dicts(LECTURE_DRAFT, "CE 4")
+    assert _count_rooms(thrice, "CE 4") == 3 * _count_rooms(once, "CE 4")
+    assert len(read_merged_ranges(thrice)["Monday"]) > 2 * len(read_merged_ranges(once)["Monday"])
+
+
+def test_regressions_beyond_tolerance_are_reported():
+    """Medians slower beyond the tolerance are reported, small slowdowns and peaks within it are not."""
+    # Arrange
+    def result(cold_ms, warm_ms, peak_rss_mb):
+        states = {"cold": {"p50_ms": cold_ms}, "warm": {"p50_ms": warm_ms}}
+        return {"draft": "Draft_1", "target": "get_time_table", "states": states, "peak_rss_mb": peak_rss_mb}
+
+    baseline = {"results": [result(300.0, 1.0, 140.0)]}
+
+    # Act
+    regressions = find_regressions([result(500.0, 1.8, 150.0)], baseline, tolerance=0.5)
+
+    # Assert
+    assert regressions == ["Draft_1 get_time_table cold: p50 300.0 ms -> 500.0 ms"]
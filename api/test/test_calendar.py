@@ -0,0 +1,178 @@
+import gzip
+import json
+from datetime import date
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from icalendar import Calendar
+
+from api.extract.extract_lectures_table import generate_calendar
+from api.routes.calendar import router as calendar_router
+
+app = FastAPI()
+app.include_router(calendar_router)
+
+client = TestClient(app)
+
+HASH = "d41d8cd98f00b204e9800998ecf8427e"
+
+TIMETABLE = [
+    {"day": "Monday", "data": [{"start": "7:00", "end": "9:00", "value": "CE 451 UMARU (VLE)"}]},
+    {"day": "Tuesday", "data": [{"start": "7:00", "end": "9:00", "value": None}]},
+    {"day": "Friday", "data": [{"start": "13:30", "end": "15:30", "value": "CE 471 ASIEDU (FI B3)\nCE 473 OWUSU (LH 6)"}]},
+]
+
+
+@pytest.fixture
+def mock_cache(mocker):
+    """Pretend the bundled draft has a fixed content hash and start with nothing cached."""
+    mocker.patch("api.routes.calendar.get_file_hash", return_value=HASH)
+    mocker.patch("api.routes.calendar.get_table_from_cache", return_value=None)
+    return mocker.patch("api.routes.calendar.add_tables_to_cache")
+
+
+@pytest.fixture
+def mock_get_timetable_payload(mocker):
+    return mocker.patch(
+        "api.routes.calendar.get_timetable_payload",
+        return_value=json.dumps({"data": TIMETABLE, "version": "v"}).encode(),
+    )
+
+
+def test_calendar_has_one_weekly_event_per_slot():
+    """Each class slot repeats weekly from its first weekday in the range."""
+    # Act
+    calendar = Calendar.from_ical(generate_calendar(TIMETABLE, date(2026, 1, 14), date(2026, 5, 8)))
+
+    # Assert
+    events = calendar.walk("VEVENT")
+    assert [str(event["summary"]) for event in events] == [
+        "CE 451 UMARU (VLE)",
+        "CE 471 ASIEDU (FI B3) CE 473 OWUSU (LH 6)",
+    ]
+    assert events[0].decoded("dtstart").isoformat() == "2026-01-19T07:00:00"
+    assert events[1].decoded("dtstart").isoformat() == "2026-01-16T13:30:00"
+    assert events[0]["rrule"]["freq"] == ["WEEKLY"]
+
+
+def test_calendar_is_deterministic():
+    """The same timetable and range always give the same bytes, whenever they are generated."""
+    assert generate_calendar(TIMETABLE, date(2026, 1, 12), date(2026, 5, 8)) == generate_calendar(
+        TIMETABLE, date(2026, 1, 12), date(2026, 5, 8)
+    )
+
+
+def test_ics_endpoint_builds_and_caches_the_calendar(mock_cache, mock_get_timetable_payload):
+    """A calendar miss is built from the timetable payload and cached per date range, plain and gzipped."""
+    # Act
+    response = client.get(
+        "/ics",
+        params={"filename": "Draft_1", "class_pattern": "CE 4", "start": "2026-01-12", "end": "2026-05-08"},
+        headers={"Accept-Encoding": "identity"},
+    )
+
+    # Assert
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/calendar")
+    assert response.headers["content-disposition"] == 'attachment; filename="CE-4.ics"'
+    assert "content-encoding" not in response.headers
+    assert response.text.count("RRULE:FREQ=WEEKLY") == 2
+    assert mock_get_timetable_payload.call_args.args[0].class_pattern == "CE 4"
+    base_filename, version, bodies = mock_cache.call_args.args
+    assert (base_filename, version) == ("Draft_1", HASH)
+    pattern = "CE 4@2026-01-12..2026-05-08.ics"
+    assert bodies[(pattern, False)] == response.content
+    assert gzip.decompress(bodies[(f"{pattern}.gz", False)]) == response.content
+
+
+def test_feed_is_served_precompressed(mock_cache, mock_get_timetable_payload):
+    """Clients accepting gzip get the compressed body with its own ETag."""
+    # Act
+    response = client.get(
+        "/feeds/Draft_1/CE 4.ics",
+        params={"start": "2026-01-12", "end": "2026-05-08"},
+        headers={"Accept-Encoding": "gzip, deflate"},
+    )
+
+    # Assert
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"].endswith('-gzip"')
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert "BEGIN:VCALENDAR" in response.text
+
+
+def test_feed_poll_of_unchanged_draft_is_not_modified(mock_cache, mock_get_timetable_payload, mocker):
+    """A poll with the current ETag or a later If-Modified-Since gets a 304 without any cache lookup."""
+    # Arrange
+    params = {"start": "2026-01-12", "end": "2026-05-08"}
+    first = client.get("/feeds/Draft_1/CE 4.ics", params=params)
+    get_table_from_cache = mocker.patch("api.routes.calendar.get_table_from_cache")
+
+    # Act
+    by_etag = client.get("/feeds/Draft_1/CE 4.ics", params=params, headers={"If-None-Match": first.headers["etag"]})
+    by_date = client.get(
+        "/feeds/Draft_1/CE 4.ics", params=params, headers={"If-Modified-Since": first.headers["last-modified"]}
+    )
+
+    # Assert
+    assert by_etag.status_code == 304
+    assert by_date.status_code == 304
+    assert by_etag.headers["etag"] == first.headers["etag"]
+    get_table_from_cache.assert_not_called()
+    mock_get_timetable_payload.assert_called_once()
+
+
+def test_lecture_feed_needs_a_date_range(mock_cache):
+    """Lecture events repeat weekly between two dates, which must be given."""
+    # Act
+    response = client.get("/feeds/Draft_1/CE 4.ics")
+
+    # Assert
+    assert response.status_code == 400
+
+
+def test_exam_feed_has_one_event_per_exam(mock_cache, mocker):
+    """Exam feeds need no date range: every exam is a single dated event."""
+    # Arrange
+    exams = [
+        {
+            "day": "Friday, 10th April 2026",
+            "data": [
+                {
+                    "start": "07:00",
+                    "end": "10:00",
+                    "value": "Industrial Electronics",
+                    "class": "CE 4A",
+                    "location": "GF1",
+                    "invigilator": "",
+                }
+            ],
+        }
+    ]
+    mocker.patch(
+        "api.routes.calendar.get_timetable_payload",
+        return_value=json.dumps({"data": exams, "version": "v"}).encode(),
+    )
+
+    # Act
+    response = client.get("/feeds/Draft_1_ex/CE 4.ics", params={"is_exam": True})
+
+    # Assert
+    assert response.status_code == 200
+    event = Calendar.from_ical(response.content).walk("VEVENT")[0]
+    assert str(event["summary"]) == "Industrial Electronics (CE 4A)"
+    assert event.decoded("dtstart").isoformat() == "2026-04-10T07:00:00"
+    assert str(event["location"]) == "GF1"
+
+
+def test_ics_endpoint_rejects_reversed_range(mock_cache):
+    """An end before the start is a client error."""
+    # Act
+    response = client.get(
+        "/ics", params={"filename": "Draft_1", "class_pattern": "CE 4", "start": "2026-05-08", "end": "2026-01-12"}
+    )
+
+    # Assert
+    assert response.status_code == 400
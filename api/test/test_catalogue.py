@@ -0,0 +1,79 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.extract.classes import ClassMention, parse_class_mentions
+from api.routes.classes import router as classes_router
+from api.services.catalogue import ClassCatalogue
+
+app = FastAPI()
+app.include_router(classes_router)
+
+client = TestClient(app)
+
+CATALOGUE = ClassCatalogue([
+    ClassMention("class", "CE 4", "CE 4"),
+    ClassMention("section", "CE 4A", "CE 4"),
+    ClassMention("course", "CE 451", "CE 4"),
+    ClassMention("class", "EL 3", "EL 3"),
+])
+
+
+def test_shared_course_mentions_every_department():
+    """A course shared by several departments belongs to each of their classes."""
+    # Act
+    mentions = parse_class_mentions("MA, CE, RP 460 ARKU")
+
+    # Assert
+    assert {mention.class_pattern for mention in mentions} == {"MA 4", "CE 4", "RP 4"}
+    assert ClassMention("course", "CE 460", "CE 4") in mentions
+
+
+def test_sections_after_a_comma_keep_their_department():
+    """Test "CE 4A, 4B" lists both sections of CE 4."""
+    # Act
+    mentions = parse_class_mentions("CE 4A, 4B MENSAH")
+
+    # Assert
+    assert {mention.name for mention in mentions if mention.kind == "section"} == {"CE 4A", "CE 4B"}
+
+
+def test_search_ignores_case_and_spacing():
+    """Prefixes match however the student types them."""
+    # Act
+    matches = CATALOGUE.search("ce4", limit=10)
+
+    # Assert
+    assert [mention.name for mention in matches] == ["CE 4", "CE 451", "CE 4A"]
+    assert CATALOGUE.search("ce 45", limit=10) == [ClassMention("course", "CE 451", "CE 4")]
+    assert len(CATALOGUE.search("CE", limit=2)) == 2
+
+
+def test_has_class_accepts_prefixes_of_known_classes():
+    """Exam classes are filtered by prefix, so a department alone is a valid class."""
+    assert CATALOGUE.has_class("CE")
+    assert CATALOGUE.has_class("el 3")
+    assert not CATALOGUE.has_class("EL 4")
+
+
+def test_classes_endpoint_lists_classes_of_a_draft(mocker, tmp_path):
+    """The catalogue of a bundled draft is searched by prefix."""
+    # Arrange
+    mocker.patch("api.extract.snapshots.SNAPSHOTS_FOLDER", tmp_path)
+
+    # Act
+    response = client.get("/classes", params={"draft": "Draft_2", "prefix": "ce 4", "limit": 50})
+
+    # Assert
+    assert response.status_code == 200
+    classes = response.json()["classes"]
+    assert {"kind": "class", "name": "CE 4", "class_pattern": "CE 4"} in classes
+    assert all(entry["name"].replace(" ", "").startswith("CE4") for entry in classes)
+
+
+def test_classes_endpoint_missing_draft():
+    """Test a missing draft is a 404."""
+    # Act
+    response = client.get("/classes", params={"draft": "Missing"})
+
+    # Assert
+    assert response.status_code == 404
@@ -0,0 +1,111 @@
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+from api.extract import extract_exam_table
+from api.extract.extract_exam_table import (
+    filter_exam_timetable,
+    get_exam_date_index,
+    get_exam_slots,
+    load_exam_timetable,
+)
+
+EXAM_DRAFT = str(Path(__file__).parents[1] / "drafts" / "Draft_1_ex.xlsx")
+
+
+@pytest.fixture
+def empty_exam_cache(mocker, tmp_path):
+    """Start every test with no parsed exam timetables in memory or on disk."""
+    mocker.patch("api.extract.snapshots.SNAPSHOTS_FOLDER", tmp_path)
+    mocker.patch.dict(extract_exam_table._exam_date_indexes, clear=True)
+    return mocker.patch.dict(extract_exam_table._exam_timetables, clear=True)
+
+
+@pytest.mark.parametrize("class_pattern", ["CE 4", "CE", "EC 2A", "M", "XX 9", ""])
+def test_class_filter_matches_string_prefixes(empty_exam_cache, class_pattern):
+    """The binary search over sorted class categories selects the same rows as str.startswith."""
+    # Arrange
+    df = load_exam_timetable(EXAM_DRAFT)
+    expected = df[df["CLASS"].astype(str).str.startswith(class_pattern)]
+
+    # Act
+    filtered = filter_exam_timetable(df, class_pattern)
+
+    # Assert
+    assert filtered.index.tolist() == expected.index.tolist()
+    assert "NO" not in filtered.columns
+
+
+def test_exam_slots_are_in_24_hour_time(empty_exam_cache):
+    """Each exam becomes one dated slot with its period converted to 24-hour time."""
+    # Act
+    slots = get_exam_slots(EXAM_DRAFT, "EC 2")
+
+    # Assert
+    assert slots[0] == {
+        "day": "Tuesday, 7th April 2026",
+        "data": [
+            {
+                "start": "07:00",
+                "end": "10:00",
+                "value": "GENERAL PYSCHOLOGY",
+                "class": "EC 2A",
+                "location": "CCG2",
+                "invigilator": slots[0]["data"][0]["invigilator"],
+            }
+        ],
+    }
+    assert {(slot["data"][0]["start"], slot["data"][0]["end"]) for slot in slots} <= {
+        ("07:00", "10:00"),
+        ("11:00", "14:00"),
+        ("15:00", "18:00"),
+    }
+
+
+def test_exam_timetable_is_loaded_once_per_content(empty_exam_cache, mocker):
+    """Later loads of an unchanged draft reuse the rows already in memory."""
+    # Arrange
+    first = load_exam_timetable(EXAM_DRAFT)
+    read_snapshot = mocker.spy(extract_exam_table, "read_snapshot")
+
+    # Act
+    second = load_exam_timetable(EXAM_DRAFT)
+
+    # Assert
+    read_snapshot.assert_not_called()
+    assert second is first
+
+
+def test_exams_by_date_range_are_in_date_order(empty_exam_cache):
+    """A date range returns exactly the class's exams on those days, earliest first."""
+    # Arrange
+    every_exam = get_exam_slots(EXAM_DRAFT, "CE 4")
+    index = get_exam_date_index(EXAM_DRAFT, "CE 4")
+    week = [day for day in index.calendar if date(2026, 4, 13) <= day <= date(2026, 4, 17)]
+    week_names = {extract_exam_table._format_date_with_suffix(day) for day in week}
+
+    # Act
+    exams = get_exam_slots(EXAM_DRAFT, "CE 4", date(2026, 4, 13), date(2026, 4, 17))
+
+    # Assert
+    assert sorted(map(str, exams)) == sorted(str(exam) for exam in every_exam if exam["day"] in week_names)
+    days = [extract_exam_table._parse_formatted_date(exam["day"]) for exam in exams]
+    assert days == sorted(days)
+
+
+def test_next_exams_start_from_the_given_day(empty_exam_cache):
+    """next returns the earliest exams on or after the day, even if that day has none."""
+    # Arrange
+    index = get_exam_date_index(EXAM_DRAFT, "CE 4")
+    all_exams = index.query()
+
+    # Act
+    next_exams = get_exam_slots(EXAM_DRAFT, "CE 4", date(2026, 4, 11), limit=2)
+    past_last_day = get_exam_slots(EXAM_DRAFT, "CE 4", date(2026, 5, 1), limit=2)
+
+    # Assert
+    days = [extract_exam_table._parse_formatted_date(exam["day"]) for exam in all_exams]
+    first = next(i for i, day in enumerate(days) if day >= date(2026, 4, 11))
+    assert next_exams == all_exams[first : first + 2]
+    assert past_last_day == []
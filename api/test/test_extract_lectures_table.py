@@ -0,0 +1,160 @@
+from pathlib import Path
+import re
+import zipfile
+import pandas as pd
+import pytest
+
+from api.extract import extract_lectures_table, readers
+from api.extract.extract_lectures_table import (
+    LectureSlot,
+    build_workbook_index,
+    get_lecture_slots,
+    get_time_table,
+    get_workbook_index,
+)
+
+DRAFT = str(Path(__file__).parents[1] / "drafts" / "Draft_2.xlsx")
+
+
+@pytest.fixture
+def empty_index_cache(mocker, tmp_path):
+    """Start every test with no parsed workbooks in memory or on disk."""
+    mocker.patch("api.extract.snapshots.SNAPSHOTS_FOLDER", tmp_path)
+    mocker.patch.dict(extract_lectures_table._sheet_indexes, clear=True)
+    return mocker.patch.dict(extract_lectures_table._workbook_indexes, clear=True)
+
+
+def _copy_with_edited_sheet(target: Path, sheet_path: str):
+    """Copy the draft, pointing the last shared string cell of one sheet at another string."""
+    with zipfile.ZipFile(DRAFT) as source, zipfile.ZipFile(target, "w") as copy:
+        for item in source.infolist():
+            content = source.read(item)
+            if item.filename == sheet_path:
+                last = list(re.finditer(rb'(t="s"[^>]*><v>)(\d+)<', content))[-1]
+                content = content[: last.start(2)] + b"0" + content[last.end(2) :]
+            copy.writestr(item, content)
+
+
+def test_workbook_is_parsed_once_for_all_classes(empty_index_cache, mocker):
+    """Different class patterns on the same draft share one parse."""
+    # Arrange
+    build = mocker.spy(extract_lectures_table, "build_workbook_index")
+
+    # Act
+    get_time_table(DRAFT, "CE 4")
+    get_time_table(DRAFT, "MN 2")
+
+    # Assert
+    build.assert_called_once_with(DRAFT)
+
+
+def test_get_time_table_filters_index(empty_index_cache):
+    """Only cells for the requested class end up in the weekly table."""
+    # Act
+    table = get_time_table(DRAFT, "CE 4")
+
+    # Assert
+    assert list(table.index[:5]) == extract_lectures_table.DAYS
+    assert table.loc["Monday", "9:00-10:00"] == "CE 451 UMARU (VLE)"
+    assert pd.isna(table.loc["Monday", "7:00-8:00"])
+
+
+def test_lecture_slots_are_merged_24_hour_slots(empty_index_cache):
+    """Slots come straight from the index, in 24-hour time, with repeats merged."""
+    # Act
+    week = get_lecture_slots(DRAFT, "CE 4")
+
+    # Assert
+    assert [day.day for day in week] == extract_lectures_table.DAYS
+    monday = week[0].data
+    assert LectureSlot("9:00", "11:00", "CE 451 UMARU (VLE)") in monday
+    assert all(slot.end == following.start for slot, following in zip(monday, monday[1:]))
+    assert all(slot.value != following.value for slot, following in zip(monday, monday[1:]))
+    assert monday[-1].end == "19:30"
+
+
+def test_workbook_index_lists_every_class_cell(empty_index_cache):
+    """The index holds the raw cell text with its day, slot and classroom."""
+    # Act
+    index = get_workbook_index(DRAFT)
+
+    # Assert
+    assert index.columns[0] == "7:00-8:00"
+    assert any(
+        cell.day == "Monday" and cell.period == "9:00-10:00" and cell.classroom == "VLE"
+        and "CE 451" in cell.text
+        for cell in index.cells
+    )
+
+
+def test_new_process_loads_index_from_snapshot(empty_index_cache, mocker):
+    """A worker with nothing in memory reads the snapshot instead of the workbook."""
+    # Arrange
+    parsed = get_workbook_index(DRAFT)
+    empty_index_cache.clear()
+    build = mocker.spy(extract_lectures_table, "build_workbook_index")
+
+    # Act
+    loaded = get_workbook_index(DRAFT)
+
+    # Assert
+    build.assert_not_called()
+    assert loaded.columns == parsed.columns
+    assert loaded.cells == parsed.cells
+    assert (loaded.text_codes == parsed.text_codes).all()
+    assert loaded.unique_texts.tolist() == parsed.unique_texts.tolist()
+
+
+def test_edited_draft_only_reparses_changed_sheet(empty_index_cache, mocker, tmp_path):
+    """Unchanged days of an edited draft come from the previous parse."""
+    # Arrange
+    with zipfile.ZipFile(DRAFT) as archive:
+        tuesday_path = readers._get_sheet_paths(archive)["Tuesday"]
+    edited = tmp_path / "Draft_2_edited.xlsx"
+    _copy_with_edited_sheet(edited, tuesday_path)
+    build_workbook_index(DRAFT)
+    parse = mocker.spy(extract_lectures_table, "_get_all_daily_tables")
+
+    # Act
+    incremental = build_workbook_index(str(edited))
+    extract_lectures_table._sheet_indexes.clear()
+    full = build_workbook_index(str(edited))
+
+    # Assert
+    assert parse.call_args_list[0].args == (str(edited), ["Tuesday"])
+    assert incremental.cells == full.cells
+    assert incremental.columns == full.columns
+
+
+def test_edit_after_snapshot_load_only_reparses_changed_sheet(empty_index_cache, mocker, tmp_path):
+    """A worker that loaded a draft's snapshot reuses its unchanged days when the draft is edited."""
+    # Arrange
+    with zipfile.ZipFile(DRAFT) as archive:
+        tuesday_path = readers._get_sheet_paths(archive)["Tuesday"]
+    edited = tmp_path / "Draft_2_edited.xlsx"
+    _copy_with_edited_sheet(edited, tuesday_path)
+    get_workbook_index(DRAFT)
+    empty_index_cache.clear()
+    extract_lectures_table._sheet_indexes.clear()
+    get_workbook_index(DRAFT)
+    parse = mocker.spy(extract_lectures_table, "_get_all_daily_tables")
+
+    # Act
+    incremental = get_workbook_index(str(edited))
+
+    # Assert
+    parse.assert_called_once_with(str(edited), ["Tuesday"])
+    extract_lectures_table._sheet_indexes.clear()
+    assert incremental.cells == build_workbook_index(str(edited)).cells
+
+
+def test_class_matcher_is_compiled_once_per_class():
+    """The same department and year reuse one compiled pattern, whatever the case."""
+    # Act
+    first = extract_lectures_table._get_class_matcher("CE 4")
+    second = extract_lectures_table._get_class_matcher("ce 4")
+
+    # Assert
+    assert first is second
+    assert first.search("MA, CE, RP 460 ARKU")
+    assert not first.search("CE 359 MENSAH")
@@ -0,0 +1,37 @@
+import hashlib
+import os
+
+from api.services import fingerprint
+from api.services.fingerprint import get_file_hash
+
+
+def test_unchanged_file_is_hashed_once(tmp_path, mocker):
+    """Repeated lookups of an unchanged file only stat it."""
+    # Arrange
+    draft = tmp_path / "Draft.xlsx"
+    draft.write_bytes(b"first draft")
+    hash_file = mocker.spy(fingerprint, "_hash_file")
+
+    # Act
+    first = get_file_hash(draft)
+    second = get_file_hash(draft)
+
+    # Assert
+    assert first == second == hashlib.md5(b"first draft").hexdigest()
+    hash_file.assert_called_once()
+
+
+def test_changed_file_is_hashed_again(tmp_path):
+    """A new stat (size or mtime) means the content is read again."""
+    # Arrange
+    draft = tmp_path / "Draft.xlsx"
+    draft.write_bytes(b"first draft")
+    get_file_hash(draft)
+
+    # Act
+    draft.write_bytes(b"second draft")
+    stat = draft.stat()
+    os.utime(draft, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    # Assert
+    assert get_file_hash(draft) == hashlib.md5(b"second draft").hexdigest()
@@ -0,0 +1,73 @@
+from api.services.memory_cache import MemoryCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_hits_and_misses_are_counted():
+    """Lookups update the hit and miss counters."""
+    # Arrange
+    cache = MemoryCache(max_entries=10, max_bytes=1024, ttl=60)
+    cache.set("Draft_1-CE4-lecture:v1", b"{}")
+
+    # Act
+    cache.get("Draft_1-CE4-lecture:v1")
+    cache.get("Draft_1-CE4-lecture:v2")
+
+    # Assert
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    """Exceeding max_entries drops the entry used longest ago."""
+    # Arrange
+    cache = MemoryCache(max_entries=2, max_bytes=1024, ttl=60)
+    cache.set("a", b"1")
+    cache.set("b", b"2")
+    cache.get("a")
+
+    # Act
+    cache.set("c", b"3")
+
+    # Assert
+    assert cache.get("a") == b"1"
+    assert cache.get("b") is None
+    assert cache.get("c") == b"3"
+
+
+def test_max_bytes_bounds_the_cache():
+    """Exceeding max_bytes evicts entries until the total fits."""
+    # Arrange
+    cache = MemoryCache(max_entries=10, max_bytes=10, ttl=60)
+    cache.set("a", b"12345")
+    cache.set("b", b"12345")
+
+    # Act
+    cache.set("c", b"123")
+    cache.set("too-big", b"x" * 11)
+
+    # Assert
+    assert cache.get("a") is None
+    assert cache.get("too-big") is None
+    assert cache.stats()["bytes"] == 8
+
+
+def test_entries_expire_after_ttl():
+    """Entries older than the TTL are treated as misses."""
+    # Arrange
+    clock = FakeClock()
+    cache = MemoryCache(max_entries=10, max_bytes=1024, ttl=60, clock=clock)
+    cache.set("a", b"1")
+
+    # Act
+    clock.now = 61
+
+    # Assert
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,56 @@
+from api.services.metrics import MetricsRegistry, merge_recorded, registry, run_recorded, span
+
+
+def test_histogram_is_rendered_with_cumulative_buckets():
+    """Prometheus buckets count every observation up to their bound."""
+    # Arrange
+    metrics = MetricsRegistry()
+    for value in (0.0004, 0.003, 0.003, 20):
+        metrics.observe("easechaos_stage_duration_seconds", value, stage="read_workbook")
+
+    # Act
+    text = metrics.render()
+
+    # Assert
+    assert "# TYPE easechaos_stage_duration_seconds histogram" in text
+    assert 'easechaos_stage_duration_seconds_bucket{stage="read_workbook",le="0.0005"} 1' in text
+    assert 'easechaos_stage_duration_seconds_bucket{stage="read_workbook",le="0.005"} 3' in text
+    assert 'easechaos_stage_duration_seconds_bucket{stage="read_workbook",le="10.0"} 3' in text
+    assert 'easechaos_stage_duration_seconds_bucket{stage="read_workbook",le="+Inf"} 4' in text
+    assert 'easechaos_stage_duration_seconds_count{stage="read_workbook"} 4' in text
+
+
+def test_counters_and_gauges_are_rendered_with_escaped_labels():
+    """Label values are escaped, so a draft name cannot break the exposition format."""
+    # Arrange
+    metrics = MetricsRegistry()
+    metrics.inc("easechaos_draft_parses_total", draft='Draft "1"', kind="lectures")
+    metrics.inc("easechaos_draft_parses_total", draft='Draft "1"', kind="lectures")
+
+    # Act
+    text = metrics.render({("easechaos_extraction_queue_depth", ()): 3})
+
+    # Assert
+    assert 'easechaos_draft_parses_total{draft="Draft \\"1\\"",kind="lectures"} 2' in text
+    assert "# TYPE easechaos_extraction_queue_depth gauge\neasechaos_extraction_queue_depth 3" in text
+
+
+def test_extraction_job_metrics_are_returned_and_merged(mocker):
+    """Spans recorded in a worker travel back with the result instead of staying in the worker."""
+    # Arrange
+    mocker.patch.object(registry, "histograms", {})
+
+    def job(value):
+        with span("lecture_slots"):
+            return value * 2
+
+    # Act
+    result, recorded = run_recorded(job, 21)
+    before_merge = dict(registry.histograms)
+    merge_recorded(recorded)
+
+    # Assert
+    assert result == 42
+    assert before_merge == {}
+    histogram = registry.histograms[("easechaos_stage_duration_seconds", (("stage", "lecture_slots"),))]
+    assert histogram.count == 1
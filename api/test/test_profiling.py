@@ -0,0 +1,61 @@
+import marshal
+from pathlib import Path
+
+import pytest
+
+from api.extract import extract_exam_table, extract_lectures_table
+from api.extract.extract_exam_table import get_exam_slots, load_exam_timetable
+from api.extract.extract_lectures_table import get_lecture_slots, get_workbook_index
+from api.services.profiling import profile_cold_call
+
+DRAFTS = Path(__file__).parents[1] / "drafts"
+LECTURE_DRAFT = str(DRAFTS / "Draft_2.xlsx")
+EXAM_DRAFT = str(DRAFTS / "Draft_1_ex.xlsx")
+
+
+@pytest.fixture(autouse=True)
+def empty_parsed_drafts(mocker, tmp_path):
+    """Start with no parsed drafts in memory or on disk."""
+    mocker.patch("api.extract.snapshots.SNAPSHOTS_FOLDER", tmp_path)
+    for parsed in (
+        extract_lectures_table._workbook_indexes,
+        extract_lectures_table._sheet_indexes,
+        extract_exam_table._exam_timetables,
+        extract_exam_table._exam_date_indexes,
+    ):
+        mocker.patch.dict(parsed, clear=True)
+
+
+def _profiled_functions(profile):
+    return {function for _, _, function in marshal.loads(profile.stats)}
+
+
+def test_cold_profile_parses_a_lecture_draft_the_worker_has(mocker):
+    """A draft in memory and snapshotted is parsed again under the profiler, and stays in memory."""
+    # Arrange
+    index = get_workbook_index(LECTURE_DRAFT)
+    parse = mocker.spy(extract_lectures_table, "_get_all_daily_tables")
+
+    # Act
+    slots, profile = profile_cold_call(10, get_lecture_slots, LECTURE_DRAFT, "CE 4")
+
+    # Assert
+    assert slots == get_lecture_slots(LECTURE_DRAFT, "CE 4")
+    assert parse.call_count == 1
+    assert "build_workbook_index" in _profiled_functions(profile)
+    assert next(iter(extract_lectures_table._workbook_indexes.values())) is index
+
+
+def test_cold_profile_reads_an_exam_draft_the_worker_has():
+    """Exam rows are read from Excel under the profiler, not from memory or the snapshot."""
+    # Arrange
+    exams = load_exam_timetable(EXAM_DRAFT)
+
+    # Act
+    slots, profile = profile_cold_call(10, get_exam_slots, EXAM_DRAFT, "CE 4")
+
+    # Assert
+    assert slots == get_exam_slots(EXAM_DRAFT, "CE 4")
+    assert "_read_exam_timetable" in _profiled_functions(profile)
+    assert "_exams_from_table" not in _profiled_functions(profile)
+    assert next(iter(extract_exam_table._exam_timetables.values())) is exams
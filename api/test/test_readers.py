@@ -0,0 +1,45 @@
+from pathlib import Path
+import pandas as pd
+import pytest
+
+from api.extract.readers import read_excel, read_merged_ranges
+
+DRAFTS = sorted((Path(__file__).parents[1] / "drafts").glob("*.xlsx"))
+
+
+@pytest.mark.parametrize("draft", DRAFTS, ids=lambda path: path.name)
+def test_engines_read_identical_frames(draft):
+    """calamine and openpyxl produce the same raw cells for every draft."""
+    pytest.importorskip("python_calamine")
+
+    # Act
+    calamine = read_excel(draft, sheet_name=None, engine="calamine")
+    openpyxl = read_excel(draft, sheet_name=None, engine="openpyxl")
+
+    # Assert
+    assert list(calamine) == list(openpyxl)
+    for sheet in openpyxl:
+        pd.testing.assert_frame_equal(calamine[sheet], openpyxl[sheet])
+
+
+def test_unavailable_engine_falls_back_to_openpyxl(mocker):
+    """A missing calamine install is not an error."""
+    # Arrange
+    read = mocker.patch("api.extract.readers.pd.read_excel")
+    read.side_effect = [ImportError("python-calamine missing"), pd.DataFrame()]
+
+    # Act
+    read_excel(DRAFTS[0], engine="calamine")
+
+    # Assert
+    assert read.call_args.kwargs["engine"] == "openpyxl"
+
+
+def test_merged_ranges_are_read_per_sheet():
+    """Merged ranges are keyed by sheet name, as (min_col, min_row, max_col, max_row)."""
+    # Act
+    merged_ranges = read_merged_ranges(DRAFTS[0])
+
+    # Assert
+    assert "Monday" in merged_ranges
+    assert all(min_col <= max_col and min_row <= max_row for min_col, min_row, max_col, max_row in merged_ranges["Monday"])
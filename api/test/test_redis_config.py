@@ -0,0 +1,97 @@
+import asyncio
+
+import fakeredis
+import pytest
+
+from api.config import redis_config
+from api.config.redis_config import add_tables_to_cache, create_cache_key_from_parameters, get_tables_from_cache
+from api.services.memory_cache import MemoryCache
+
+
+@pytest.fixture
+def mock_redis(mocker):
+    mocker.patch.object(
+        redis_config, "l1_cache", MemoryCache(max_entries=10, max_bytes=1024, ttl=60)
+    )
+    return mocker.patch.object(redis_config, "r", mocker.AsyncMock())
+
+
+def _run_with_fake_redis(mocker, scenario) -> dict[bytes, bytes]:
+    """Run a scenario against an in-memory Redis, returning the draft's keys and values after it."""
+    mocker.patch.object(redis_config, "l1_cache", MemoryCache(max_entries=10, max_bytes=1024, ttl=60))
+
+    async def run():
+        fake = mocker.patch.object(redis_config, "r", fakeredis.aioredis.FakeRedis())
+        await scenario()
+        keys = await fake.keys("Draft_1:*")
+        return dict(zip(keys, await fake.mget(keys)))
+
+    return asyncio.run(run())
+
+
+async def _cache(version: str, payload: bytes):
+    await add_tables_to_cache("Draft_1", version, {("CE 4", False): payload})
+
+
+def test_cache_key_embeds_draft_version():
+    """Different draft versions never share a cache key."""
+    # Act
+    old = create_cache_key_from_parameters("Draft_1", "CE 4", False, "v1")
+    new = create_cache_key_from_parameters("Draft_1", "CE 4", False, "v2")
+
+    # Assert
+    assert old == "Draft_1:v1:CE4-lecture"
+    assert old != new
+
+
+def test_batched_lookup_uses_one_mget(mock_redis):
+    """Several patterns are fetched in one round trip and copied into L1."""
+    # Arrange
+    mock_redis.mget.return_value = [b'{"data":[]}', None]
+    queries = [("CE 4", False), ("CE 4", True)]
+
+    # Act
+    tables = asyncio.run(get_tables_from_cache("Draft_1", "v1", queries))
+    again = asyncio.run(get_tables_from_cache("Draft_1", "v1", queries[:1]))
+
+    # Assert
+    mock_redis.mget.assert_awaited_once_with(["Draft_1:v1:CE4-lecture", "Draft_1:v1:CE4-exam"])
+    assert tables == {("CE 4", False): b'{"data":[]}', ("CE 4", True): None}
+    assert again == {("CE 4", False): b'{"data":[]}'}
+
+
+def test_new_draft_version_replaces_the_old_one(mocker):
+    """The first write of a new version moves the current version and deletes the old one's entries."""
+    # Arrange
+    draft_version = mocker.patch("api.config.redis_config.get_file_hash")
+
+    async def swap():
+        draft_version.return_value = "v1"
+        await _cache("v1", b"old")
+        draft_version.return_value = "v2"
+        await _cache("v2", b"new")
+
+    # Act
+    entries = _run_with_fake_redis(mocker, swap)
+
+    # Assert
+    assert entries == {b"Draft_1:current": b"v2", b"Draft_1:v2:CE4-lecture": b"new"}
+
+
+def test_late_write_of_superseded_version_is_not_cached(mocker):
+    """An extraction of the old version finishing after the swap leaves the new version's entries alone."""
+    # Arrange
+    draft_version = mocker.patch("api.config.redis_config.get_file_hash")
+
+    async def swap_then_late_write():
+        draft_version.return_value = "v1"
+        await _cache("v1", b"old")
+        draft_version.return_value = "v2"
+        await _cache("v2", b"new")
+        await _cache("v1", b"late")
+
+    # Act
+    entries = _run_with_fake_redis(mocker, swap_then_late_write)
+
+    # Assert
+    assert entries == {b"Draft_1:current": b"v2", b"Draft_1:v2:CE4-lecture": b"new"}
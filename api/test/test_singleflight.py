@@ -0,0 +1,40 @@
+import asyncio
+
+from api.services.singleflight import single_flight
+
+
+def test_concurrent_callers_share_one_call():
+    """Callers for the same key while a call is in flight get its result."""
+    calls = []
+
+    async def extract():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "table"
+
+    async def main():
+        return await asyncio.gather(*(single_flight("CE4:v1", extract) for _ in range(5)))
+
+    # Act
+    results = asyncio.run(main())
+
+    # Assert
+    assert results == ["table"] * 5
+    assert len(calls) == 1
+
+
+def test_new_call_after_flight_completes():
+    """Once a call finishes, the next caller for the key runs it again."""
+    calls = []
+
+    async def extract():
+        calls.append(1)
+        return len(calls)
+
+    async def main():
+        first = await single_flight("CE4:v1", extract)
+        second = await single_flight("CE4:v1", extract)
+        return first, second
+
+    # Act / Assert
+    assert asyncio.run(main()) == (1, 2)
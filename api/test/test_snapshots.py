@@ -0,0 +1,89 @@
+from pathlib import Path
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from api.extract import extract_exam_table
+from api.extract.extract_exam_table import load_exam_timetable
+from api.extract.snapshots import get_snapshot_path, read_snapshot, write_snapshot
+
+EXAM_DRAFT = str(Path(__file__).parents[1] / "drafts" / "Draft_1_ex.xlsx")
+
+
+@pytest.fixture
+def snapshots_folder(mocker, tmp_path):
+    """Write snapshots to a temporary folder, with no exam timetables in memory."""
+    mocker.patch("api.extract.snapshots.SNAPSHOTS_FOLDER", tmp_path)
+    mocker.patch.dict(extract_exam_table._exam_timetables, clear=True)
+    return tmp_path
+
+
+def test_exam_rows_round_trip_through_snapshot(snapshots_folder, mocker):
+    """The second load memory-maps the snapshot and returns identical rows, mixed-type cells as text."""
+    # Arrange
+    parsed = load_exam_timetable(EXAM_DRAFT)
+    extract_exam_table._exam_timetables.clear()
+    read = mocker.spy(extract_exam_table, "_read_exam_timetable")
+
+    # Act
+    loaded = load_exam_timetable(EXAM_DRAFT)
+
+    # Assert
+    read.assert_not_called()
+    # NO. holds both ints and strings, which one Arrow column cannot
+    pd.testing.assert_frame_equal(loaded, parsed.astype({"NO.": str}))
+    assert isinstance(loaded["DATE"].dtype, pd.CategoricalDtype)
+
+
+def test_unreadable_snapshot_is_ignored(snapshots_folder):
+    """A corrupt snapshot is treated as missing rather than failing the request."""
+    # Arrange
+    path = get_snapshot_path(EXAM_DRAFT, "abc", "exams")
+    path.parent.mkdir()
+    path.write_bytes(b"not arrow")
+
+    # Act
+    table = read_snapshot(EXAM_DRAFT, "abc", "exams")
+
+    # Assert
+    assert table is None
+
+
+def _snapshot_paths(folder):
+    return sorted(folder.rglob("*.arrow"))
+
+
+def _write(version, kind="exams"):
+    write_snapshot(EXAM_DRAFT, version, kind, lambda: pa.table({"version": [version]}))
+
+
+def test_new_draft_version_replaces_older_snapshots(snapshots_folder, mocker):
+    """Snapshotting a draft's new version removes that draft's snapshot of the old one, of the same kind."""
+    # Arrange
+    file_hash = mocker.patch("api.extract.snapshots.get_file_hash", return_value="v1")
+    _write("v1")
+    _write("v1", kind="lectures")
+    file_hash.return_value = "v2"
+
+    # Act
+    _write("v2")
+
+    # Assert
+    assert _snapshot_paths(snapshots_folder) == [
+        get_snapshot_path(EXAM_DRAFT, "v1", "lectures"),
+        get_snapshot_path(EXAM_DRAFT, "v2", "exams"),
+    ]
+
+
+def test_late_snapshot_of_superseded_version_is_not_written(snapshots_folder, mocker):
+    """A parse of the old version finishing after the draft changed neither writes nor removes snapshots."""
+    # Arrange
+    mocker.patch("api.extract.snapshots.get_file_hash", return_value="v2")
+    _write("v2")
+
+    # Act
+    _write("v1")
+
+    # Assert
+    assert _snapshot_paths(snapshots_folder) == [get_snapshot_path(EXAM_DRAFT, "v2", "exams")]
+    assert read_snapshot(EXAM_DRAFT, "v2", "exams").column("version").to_pylist() == ["v2"]
@@ -1,6 +1,14 @@
 from fastapi.testclient import TestClient
 from fastapi import FastAPI
+from api.config.redis_config import settings
 from api.routes.timetable import router as timetable_router, TimeTableRequest
+from api.extract.classes import ClassMention
+from api.extract.extract_lectures_table import DaySlots
+from api.services.catalogue import ClassCatalogue
+from api.services.extraction import ExtractionQueueFull
+from datetime import date
+import json
+import pstats
 import pytest
 
 app = FastAPI()
@@ -8,31 +16,40 @@ app.include_router(timetable_router)
 
 client = TestClient(app)
 
+HASH = "d41d8cd98f00b204e9800998ecf8427e"
+
 
 @pytest.fixture
 def mock_get_table_from_cache(mocker):
-    return mocker.patch("api.config.redis_config.get_table_from_cache")
+    return mocker.patch("api.routes.timetable.get_table_from_cache")
 
 
 @pytest.fixture
 def mock_add_table_to_cache(mocker):
-    return mocker.patch("api.config.redis_config.add_table_to_cache")
+    return mocker.patch("api.routes.timetable.add_table_to_cache")
+
+
+@pytest.fixture
+def mock_get_file_hash(mocker):
+    """Pretend the requested draft exists with a fixed content hash."""
+    mocker.patch("api.routes.timetable.os.path.exists", return_value=True)
+    return mocker.patch("api.routes.timetable.get_file_hash", return_value=HASH)
 
 
 @pytest.fixture
-def mock_get_time_table(mocker):
+def mock_get_lecture_slots(mocker):
     """Mock lecture timetable extraction function."""
-    return mocker.patch("api.extract.extract_lectures_table.get_time_table")
+    return mocker.patch("api.routes.timetable.get_lecture_slots")
 
 
 @pytest.fixture
-def mock_get_exam_timetable(mocker):
+def mock_get_exam_slots(mocker):
     """Mock exam timetable extraction function."""
-    return mocker.patch("api.extract.extract_exam_table.get_exam_timetable")
+    return mocker.patch("api.routes.timetable.get_exam_slots")
 
 
 def test_get_lecture_time_table_endpoint(
-    mock_get_table_from_cache, mock_add_table_to_cache, mock_get_time_table
+    mock_get_table_from_cache, mock_add_table_to_cache, mock_get_file_hash, mock_get_lecture_slots
 ):
     """Test lecture timetable endpoint with cache miss."""
     # Arrange
@@ -40,9 +57,7 @@ def test_get_lecture_time_table_endpoint(
         filename="test.xlsx", class_pattern="MECH 3", is_exam=False
     )
     mock_get_table_from_cache.return_value = None
-    mock_get_time_table.return_value.to_json.return_value = (
-        '[{"day": "Monday", "data": []}]'
-    )
+    mock_get_lecture_slots.return_value = [DaySlots("Monday", [])]
 
     # Act
     response = client.post("/get_time_table", json=request.dict())
@@ -51,17 +66,18 @@ def test_get_lecture_time_table_endpoint(
     assert response.status_code == 200
     assert "data" in response.json()
     assert "version" in response.json()
-    mock_get_table_from_cache.assert_called_once_with("test", "MECH 3", False)
+    mock_get_table_from_cache.assert_called_once_with("test", "MECH 3", False, HASH)
     mock_add_table_to_cache.assert_called_once_with(
-        table='[{"day": "Monday", "data": []}]',
+        table=b'{"data":[{"day":"Monday","data":[]}],"version":"d41d8cd98f00b204e9800998ecf8427e"}',
         filename="test",
         class_pattern="MECH 3",
         is_exam=False,
+        version=HASH,
     )
 
 
 def test_get_exam_time_table_endpoint(
-    mock_get_table_from_cache, mock_add_table_to_cache, mock_get_exam_timetable
+    mock_get_table_from_cache, mock_add_table_to_cache, mock_get_file_hash, mock_get_exam_slots
 ):
     """Test exam timetable endpoint with cache miss."""
     # Arrange
@@ -69,9 +85,7 @@ def test_get_exam_time_table_endpoint(
         filename="exam_test.xlsx", class_pattern="CE 4", is_exam=True
     )
     mock_get_table_from_cache.return_value = None
-    mock_get_exam_timetable.return_value.to_json.return_value = (
-        '[{"DATE": "2024-01-15", "COURSE": "MATH 301"}]'
-    )
+    mock_get_exam_slots.return_value = []
 
     # Act
     response = client.post("/get_time_table", json=request.dict())
@@ -80,30 +94,94 @@ def test_get_exam_time_table_endpoint(
     assert response.status_code == 200
     assert "data" in response.json()
     assert "version" in response.json()
-    mock_get_table_from_cache.assert_called_once_with("exam_test", "CE 4", True)
+    mock_get_table_from_cache.assert_called_once_with("exam_test", "CE 4", True, HASH)
     mock_add_table_to_cache.assert_called_once_with(
-        table='[{"DATE": "2024-01-15", "COURSE": "MATH 301"}]',
+        table=b'{"data":[],"version":"d41d8cd98f00b204e9800998ecf8427e"}',
         filename="exam_test",
         class_pattern="CE 4",
         is_exam=True,
+        version=HASH,
+    )
+
+
+def test_get_exam_time_table_by_date_range(
+    mock_get_table_from_cache, mock_add_table_to_cache, mock_get_file_hash, mock_get_exam_slots
+):
+    """Test exam dates are passed to extraction and cached apart from the full timetable."""
+    # Arrange
+    mock_get_table_from_cache.return_value = None
+    mock_get_exam_slots.return_value = []
+
+    # Act
+    response = client.get(
+        "/get_time_table",
+        params={
+            "filename": "exam_test",
+            "class_pattern": "CE 4",
+            "is_exam": True,
+            "from": "2026-04-13",
+            "to": "2026-04-17",
+        },
+    )
+
+    # Assert
+    assert response.status_code == 200
+    assert mock_get_exam_slots.call_args.args[1:] == ("CE 4", date(2026, 4, 13), date(2026, 4, 17), None)
+    mock_get_table_from_cache.assert_called_once_with(
+        "exam_test", "CE 4@2026-04-13..2026-04-17#", True, HASH
+    )
+    assert mock_add_table_to_cache.call_args.kwargs["class_pattern"] == "CE 4@2026-04-13..2026-04-17#"
+
+
+def test_next_exams_count_from_today(mock_get_table_from_cache, mock_get_file_hash, mock_get_exam_slots):
+    """Test next without from asks for the exams from today on."""
+    # Arrange
+    mock_get_table_from_cache.return_value = None
+    mock_get_exam_slots.return_value = []
+
+    # Act
+    response = client.post(
+        "/get_time_table",
+        json={"filename": "exam_test", "class_pattern": "CE 4", "is_exam": True, "next": 1},
+    )
+
+    # Assert
+    assert response.status_code == 200
+    assert mock_get_exam_slots.call_args.args[2:] == (date.today(), None, 1)
+
+
+def test_date_filter_is_rejected_for_lectures(mock_get_table_from_cache, mock_get_file_hash):
+    """Test from/to/next are refused for lecture timetables."""
+    # Act
+    response = client.post(
+        "/get_time_table",
+        json={"filename": "test", "class_pattern": "CE 4", "from": "2026-04-13"},
     )
 
+    # Assert
+    assert response.status_code == 400
+    mock_get_table_from_cache.assert_not_called()
+
 
-def test_get_time_table_cache_hit(mock_get_table_from_cache, mock_add_table_to_cache):
+def test_get_time_table_cache_hit(
+    mock_get_table_from_cache, mock_add_table_to_cache, mock_get_file_hash
+):
     """Test timetable endpoint with cache hit."""
     # Arrange
     request = TimeTableRequest(
         filename="cached.xlsx", class_pattern="EL 3", is_exam=False
     )
-    mock_get_table_from_cache.return_value = '[{"day": "Monday", "data": []}]'
+    mock_get_table_from_cache.return_value = (
+        b'{"data":[{"day":"Monday","data":[]}],"version":"d41d8cd98f00b204e9800998ecf8427e"}'
+    )
 
     # Act
     response = client.post("/get_time_table", json=request.dict())
 
     # Assert
     assert response.status_code == 200
-    assert "data" in response.json()
-    mock_get_table_from_cache.assert_called_once_with("cached", "EL 3", False)
+    assert response.json()["data"] == [{"day": "Monday", "data": []}]
+    mock_get_table_from_cache.assert_called_once_with("cached", "EL 3", False, HASH)
     # Cache add should not be called on hit
     mock_add_table_to_cache.assert_not_called()
 
@@ -122,3 +200,165 @@ def test_get_time_table_file_not_found(mock_get_table_from_cache):
     # Assert
     assert response.status_code == 404
     assert "Timetable file not found" in response.json()["detail"]
+
+
+def test_get_time_table_extraction_queue_full(
+    mock_get_table_from_cache, mock_add_table_to_cache, mock_get_file_hash, mocker
+):
+    """Test timetable endpoint sheds load when the extraction queue is full."""
+    # Arrange
+    request = TimeTableRequest(
+        filename="busy.xlsx", class_pattern="CE 4", is_exam=False
+    )
+    mock_get_table_from_cache.return_value = None
+    mocker.patch(
+        "api.routes.timetable.run_extraction",
+        side_effect=ExtractionQueueFull("queue full"),
+    )
+
+    # Act
+    response = client.post("/get_time_table", json=request.dict())
+
+    # Assert
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "5"
+    mock_add_table_to_cache.assert_not_called()
+
+
+def test_get_time_table_not_modified(
+    mock_get_table_from_cache, mock_add_table_to_cache, mock_get_file_hash
+):
+    """Test timetable endpoint answers 304 for a current ETag without touching the cache."""
+    # Arrange
+    params = {"filename": "cached.xlsx", "class_pattern": "EL 3", "is_exam": False}
+    mock_get_table_from_cache.return_value = (
+        b'{"data":[],"version":"d41d8cd98f00b204e9800998ecf8427e"}'
+    )
+    etag = client.get("/get_time_table", params=params).headers["ETag"]
+    mock_get_table_from_cache.reset_mock()
+
+    # Act
+    response = client.get(
+        "/get_time_table", params=params, headers={"If-None-Match": etag}
+    )
+
+    # Assert
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert response.content == b""
+    mock_get_table_from_cache.assert_not_called()
+
+
+def test_get_time_table_etag_changes_with_class(mock_get_table_from_cache, mock_get_file_hash):
+    """Test timetable ETag differs per class pattern for the same draft version."""
+    # Arrange
+    mock_get_table_from_cache.return_value = b'{"data":[],"version":"v"}'
+
+    # Act
+    first = client.post(
+        "/get_time_table", json={"filename": "cached.xlsx", "class_pattern": "EL 3"}
+    )
+    second = client.post(
+        "/get_time_table", json={"filename": "cached.xlsx", "class_pattern": "CE 4"}
+    )
+
+    # Assert
+    assert first.headers["ETag"] != second.headers["ETag"]
+
+
+def test_get_time_table_batch_endpoint(mock_get_file_hash, mock_get_lecture_slots, mocker):
+    """Test batch endpoint streams cache hits and extracts misses together."""
+    # Arrange
+    mocker.patch(
+        "api.routes.timetable.get_tables_from_cache",
+        return_value={
+            ("CE 4", False): b'{"data":[],"version":"cached"}',
+            ("MN 2", False): None,
+            ("EL 3", False): None,
+        },
+    )
+    mock_add_tables = mocker.patch("api.routes.timetable.add_tables_to_cache")
+    mock_get_lecture_slots.return_value = [DaySlots("Monday", [])]
+
+    # Act
+    response = client.post(
+        "/get_time_table/batch",
+        json={"filename": "test.xlsx", "class_patterns": ["CE 4", "MN 2", "EL 3"]},
+    )
+
+    # Assert
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[0] == {"class_pattern": "CE 4", "is_exam": False, "data": [], "version": "cached"}
+    assert [line["class_pattern"] for line in lines[1:]] == ["MN 2", "EL 3"]
+    assert lines[1]["data"] == [{"day": "Monday", "data": []}]
+    assert mock_get_lecture_slots.call_count == 2
+    mock_add_tables.assert_called_once()
+
+
+def test_unknown_class_is_rejected_without_extraction(
+    mock_get_table_from_cache, mock_get_file_hash, mock_get_lecture_slots, mocker
+):
+    """Test a class missing from the draft's loaded catalogue gets a 404 without extraction."""
+    # Arrange
+    mock_get_table_from_cache.return_value = None
+    mocker.patch(
+        "api.routes.timetable.get_loaded_catalogue",
+        return_value=ClassCatalogue([ClassMention("class", "CE 4", "CE 4")]),
+    )
+
+    # Act
+    response = client.post(
+        "/get_time_table", json={"filename": "test.xlsx", "class_pattern": "XY 9"}
+    )
+
+    # Assert
+    assert response.status_code == 404
+    mock_get_lecture_slots.assert_not_called()
+
+
+def test_get_time_table_profiled_with_admin_token(
+    mock_get_table_from_cache, mock_get_file_hash, mock_get_lecture_slots, mocker, tmp_path
+):
+    """Test a request carrying the profiling token is extracted under cProfile, bypassing the cache."""
+    # Arrange
+    mocker.patch.object(settings, "PROFILING_TOKEN", "secret")
+    mocker.patch.object(settings, "PROFILES_FOLDER", str(tmp_path))
+    mock_get_lecture_slots.return_value = [DaySlots("Monday", [])]
+
+    # Act
+    response = client.post(
+        "/get_time_table",
+        json={"filename": "test.xlsx", "class_pattern": "CE 4"},
+        headers={"X-Profile": "secret"},
+    )
+
+    # Assert
+    assert response.status_code == 200
+    assert response.json()["data"] == [{"day": "Monday", "data": []}]
+    assert response.headers["Cache-Control"] == "no-store"
+    assert "ms" in response.headers["X-Profile-Top"]
+    stats = pstats.Stats(str(tmp_path / response.headers["X-Profile-Stats"]))
+    assert any(function == "build_timetable_payload" for _, _, function in stats.stats)
+    mock_get_table_from_cache.assert_not_called()
+
+
+@pytest.mark.parametrize("configured_token", ["", "secret"])
+def test_get_time_table_profiling_needs_the_token(
+    mock_get_table_from_cache, mock_get_file_hash, mocker, configured_token
+):
+    """Test profiling is refused when disabled or with the wrong token."""
+    # Arrange
+    mocker.patch.object(settings, "PROFILING_TOKEN", configured_token)
+
+    # Act
+    response = client.get(
+        "/get_time_table",
+        params={"filename": "test.xlsx", "class_pattern": "CE 4"},
+        headers={"X-Profile": "guess"},
+    )
+
+    # Assert
+    assert response.status_code == 403
+    mock_get_table_from_cache.assert_not_called()
@@ -0,0 +1,102 @@
+import asyncio
+import shutil
+from pathlib import Path
+import pytest
+
+from api.services import warmup
+from api.services.warmup import DraftWatcher, is_draft_file
+
+DRAFT = Path(__file__).parents[1] / "drafts" / "Draft_2.xlsx"
+
+
+@pytest.fixture
+def draft(tmp_path, mocker):
+    """A lecture draft in its own folder, with snapshots kept out of the repo."""
+    mocker.patch("api.extract.snapshots.SNAPSHOTS_FOLDER", tmp_path / "snapshots")
+    path = tmp_path / "drafts" / "Draft_2.xlsx"
+    path.parent.mkdir()
+    shutil.copy(DRAFT, path)
+    return path
+
+
+@pytest.fixture
+def mock_cache(mocker):
+    """An empty cache: every lookup misses, and no other worker holds a warm-up lock."""
+
+    async def get_tables(filename, version, queries):
+        return {query: None for query in queries}
+
+    get = mocker.patch("api.services.warmup.get_tables_from_cache", side_effect=get_tables)
+    add = mocker.patch("api.services.warmup.add_tables_to_cache")
+    mocker.patch("api.services.warmup.acquire_lock", return_value="token")
+    mocker.patch("api.services.warmup.release_lock")
+    return get, add
+
+
+def test_warm_caches_every_class_of_a_draft(draft, mock_cache):
+    """All discovered lecture classes are extracted and cached."""
+    # Arrange
+    _, add = mock_cache
+    watcher = DraftWatcher(draft.parent)
+
+    # Act
+    asyncio.run(watcher.warm(str(draft)))
+
+    # Assert
+    status = watcher.drafts["Draft_2.xlsx"]
+    assert status["state"] == "warm"
+    assert status["lecture"]["done"] == status["lecture"]["total"] > 0
+    cached = {query for call in add.call_args_list for query in call.args[2]}
+    assert ("CE 4", False) in cached
+    assert len(cached) == status["lecture"]["total"]
+
+
+def test_warm_draft_is_not_warmed_again(draft, mock_cache, mocker):
+    """An unchanged draft that is already warm is skipped."""
+    # Arrange
+    watcher = DraftWatcher(draft.parent)
+    asyncio.run(watcher.warm(str(draft)))
+    run_extraction = mocker.spy(warmup, "run_extraction")
+
+    # Act
+    asyncio.run(watcher.warm(str(draft)))
+
+    # Assert
+    run_extraction.assert_not_called()
+
+
+def test_draft_warmed_by_another_worker_is_skipped(draft, mock_cache, mocker):
+    """A draft version whose warm-up lock is held elsewhere is left to that worker."""
+    # Arrange
+    acquire_lock = mocker.patch("api.services.warmup.acquire_lock", return_value=None)
+    run_extraction = mocker.spy(warmup, "run_extraction")
+    watcher = DraftWatcher(draft.parent)
+
+    # Act
+    asyncio.run(watcher.warm(str(draft)))
+
+    # Assert
+    version = watcher.drafts["Draft_2.xlsx"]["version"]
+    acquire_lock.assert_called_once_with(f"warmup:Draft_2:{version}", warmup.settings.WARMUP_LOCK_TIMEOUT)
+    assert watcher.drafts["Draft_2.xlsx"]["state"] == "warming_elsewhere"
+    run_extraction.assert_not_called()
+
+
+def test_warm_up_lock_is_released(draft, mock_cache):
+    """The lock is released once the draft is warm, so a later change can be warmed by any worker."""
+    # Arrange
+    watcher = DraftWatcher(draft.parent)
+
+    # Act
+    asyncio.run(watcher.warm(str(draft)))
+
+    # Assert
+    version = watcher.drafts["Draft_2.xlsx"]["version"]
+    warmup.release_lock.assert_called_once_with(f"warmup:Draft_2:{version}", "token")
+
+
+def test_only_drafts_are_watched():
+    """Office lock files and other files don't trigger warming."""
+    assert is_draft_file("/drafts/Draft_3.xlsx")
+    assert not is_draft_file("/drafts/~$Draft_3.xlsx")
+    assert not is_draft_file("/drafts/notes.txt")